@@ -0,0 +1,29 @@
+import sys, os, json, gc, tracemalloc, argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from playlist_store import EntryStore
+import m3u
+def synthetic(n, groups=300):
+    return [{"filename": f"http://host{i % 50}.example/live/{i}.ts", "title": f"Channel {i} HD", "group": f"Group {i % groups}"} for i in range(n)]
+def measure(build, blob, n):
+    gc.collect(); tracemalloc.start()
+    data = json.loads(blob); rep = build(data); del data
+    gc.collect(); size = tracemalloc.get_traced_memory()[0]; tracemalloc.stop()
+    return size / n, rep
+def build_dicts(data):
+    m3u_groups = {m3u.normalize(i["title"]): "".join(i["group"]) for i in data}
+    url_to_group = {i["filename"]: "".join(i["group"]) for i in data}
+    items = [{"name": i["title"].strip(), "filename": i["filename"], "orig_idx": idx, "group": url_to_group.get(i["filename"])} for idx, i in enumerate(data)]
+    return items, m3u_groups, url_to_group
+def build_store(data):
+    m3u_groups = {m3u.normalize(i["title"]): sys.intern(i["group"]) for i in data}
+    url_to_group = {i["filename"]: sys.intern(i["group"]) for i in data}
+    store = EntryStore()
+    for i in data: store.add(i["title"].strip(), i["filename"], url_to_group.get(i["filename"]))
+    return store, m3u_groups, url_to_group
+def main():
+    ap = argparse.ArgumentParser(); ap.add_argument("-n", type=int, default=100000); ap.add_argument("--json", action="store_true")
+    a = ap.parse_args(); blob = json.dumps(synthetic(a.n))
+    before, _ = measure(build_dicts, blob, a.n); after, _ = measure(build_store, blob, a.n)
+    res = {"entries": a.n, "bytes_per_entry_dicts": round(before, 1), "bytes_per_entry_store": round(after, 1), "saved_pct": round(100 * (1 - after / before), 1)}
+    print(json.dumps(res) if a.json else "\n".join(f"{k}: {v}" for k, v in res.items()))
+if __name__ == "__main__": main()
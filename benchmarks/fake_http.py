@@ -0,0 +1,66 @@
+import time, gzip, zlib, struct, threading, argparse
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+def expected(i): return not (i % 5 == 0 or i % 11 == 0 or i % 13 == 0)
+def logo_ok(i): return i % 17 != 0
+def png(i, size=48):
+    chunk = lambda tag, data: struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+    rows = b"".join(b"\0" + b"".join(bytes(((x * 7 + y * 3 + i) % 256, (i * 13) % 256, (x ^ y) % 256)) for x in range(size)) for y in range(size))
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+@lru_cache(maxsize=4)
+def playlist(n):
+    return ("#EXTM3U\n" + "".join(f'#EXTINF:-1 tvg-id="ch{i}" tvg-logo="/logo/{i}.png" group-title="Group {i % 40}",Channel {i}\n' + (f"/live/{i}.ts\n" if i % 2 else f"http://127.0.0.1/hls/{i}.m3u8\n") for i in range(n))).encode()
+def urls(base, n):
+    out = []
+    for i in range(n):
+        kind = i % 4
+        out.append(f"{base}/live/{i}.ts" if kind == 0 else f"{base}/hls/{i}.m3u8" if kind == 1 else f"{base}/redir/{i}" if kind == 2 else f"{base}/chunked/{i}.m3u8")
+    return out
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    def log_message(self, *a): pass
+    def _send(self, status, body=b"", ctype="video/mp2t", chunked=False, **hdr):
+        self.send_response(status); self.send_header("Content-Type", ctype)
+        for k, v in hdr.items(): self.send_header(k.replace("_", "-"), v)
+        if chunked: self.send_header("Transfer-Encoding", "chunked")
+        else: self.send_header("Content-Length", str(len(body)))
+        self.send_header("Connection", "close"); self.end_headers()
+        if chunked:
+            for k in range(0, len(body), 7): self.wfile.write(b"%x\r\n%s\r\n" % (len(body[k:k + 7]), body[k:k + 7]))
+            self.wfile.write(b"0\r\n\r\n")
+        else: self.wfile.write(body)
+    def do_GET(self):
+        if self.server.delay: time.sleep(self.server.delay)
+        parts = self.path.strip("/").split("/")
+        try: i = int(parts[1].split(".")[0])
+        except (IndexError, ValueError): return self._send(404)
+        ok, kind = expected(i), parts[0]
+        if kind == "playlist":
+            tag = f'"pl-{i}"'
+            if self.headers.get("If-None-Match") == tag: return self._send(304)
+            body, enc = playlist(i), {}
+            if "gzip" in self.headers.get("Accept-Encoding", ""): body, enc = gzip.compress(body, 1), {"Content_Encoding": "gzip"}
+            return self._send(200, body, "audio/x-mpegurl", ETag=tag, Last_Modified="Sat, 01 Aug 2026 00:00:00 GMT", **enc)
+        if kind == "logo": return self._send(200, png(i), "image/png") if logo_ok(i) else self._send(404)
+        if i % 13 == 0 and kind == "live": return self._send(200)
+        if i % 11 == 0 and kind in ("hls", "chunked") and len(parts) == 2: return self._send(200, b"<html>not a playlist</html>", "text/html")
+        if not ok: return self._send(404 if i % 2 else 503)
+        if kind == "live": return self._send(206, b"\x47" * 1880)
+        if kind == "redir": return self._send(302, Location=f"/live/{i}.ts")
+        if len(parts) == 2: return self._send(200, f"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=800000\n{i}/low.m3u8\n#EXT-X-STREAM-INF:BANDWIDTH=2000000\n{i}/high.m3u8\n".encode(), "application/vnd.apple.mpegurl", chunked=kind == "chunked")
+        return self._send(200, b"#EXTM3U\n#EXT-X-TARGETDURATION:6\n#EXTINF:6.0,\nseg0.ts\n", "application/x-mpegURL")
+class Server(ThreadingHTTPServer): request_queue_size = 1024
+def serve(port=0, delay=0.0):
+    srv = Server(("127.0.0.1", port), Handler); srv.daemon_threads, srv.delay = True, delay
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+def main():
+    ap = argparse.ArgumentParser(description="Local HTTP stand-in for IPTV stream endpoints")
+    ap.add_argument("--port", type=int, default=8089); ap.add_argument("--delay", type=float, default=0.0); ap.add_argument("-n", type=int, default=0)
+    a = ap.parse_args()
+    srv, base = serve(a.port, a.delay); print(f"serving on {base}", flush=True)
+    if a.n: print("\n".join(urls(base, a.n)), flush=True)
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt: srv.shutdown()
+if __name__ == "__main__": main()
@@ -0,0 +1,190 @@
+import sys, os, json, socket, threading, time, argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import m3u
+OPTIONS = ("prefetch-playlist", "cache", "cache-secs", "demuxer-readahead-secs", "demuxer-max-bytes")
+def synthetic_playlist(n):
+    return [{"filename": f"http://host{i % 50}.example/live/{i}.ts", "title": f"Channel {i} HD"} for i in range(n)]
+def read_m3u(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return [dict({"filename": m3u.resolve(path, e.url)}, **({"title": e.name} if e.name else {})) for e in m3u.iter_entries(f)]
+class FakeMPV:
+    def __init__(self, path, count=0, latency=0.0, playlist=None, startup=0.0):
+        self.path, self.latency, self.startup, self.options, self.warm = path, latency, startup, {}, False
+        self.playlist = list(playlist) if playlist is not None else synthetic_playlist(count)
+        self.pos, self.pause, self.volume = (0 if self.playlist else -1), False, 100.0
+        self.lock, self.conns, self.sock, self.stopped = threading.RLock(), [], None, False
+        self.requests, self.wake, self.starting = 0, threading.Event(), False
+    def start(self):
+        try: os.unlink(self.path)
+        except OSError: pass
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM); self.sock.bind(self.path); self.sock.listen(16)
+        threading.Thread(target=self._accept, daemon=True).start()
+        threading.Thread(target=self._notifier, daemon=True).start()
+        return self
+    def stop(self):
+        self.stopped = True; self.wake.set()
+        try: self.sock.close()
+        except OSError: pass
+        with self.lock: conns, self.conns = self.conns, []
+        for c in conns:
+            try: c[0].shutdown(socket.SHUT_RDWR); c[0].close()
+            except OSError: pass
+        try: os.unlink(self.path)
+        except OSError: pass
+    def load(self, playlist, pos=0):
+        with self.lock: self.playlist, self.pos = list(playlist), (pos if playlist else -1)
+        self.wake.set()
+    def _notifier(self):
+        while True:
+            self.wake.wait(); self.wake.clear()
+            if self.stopped: return
+            with self.lock: started, self.starting = self.starting, False
+            self._changed(started)
+    def _accept(self):
+        while not self.stopped:
+            try: c, _ = self.sock.accept()
+            except OSError: return
+            conn = [c, {}, threading.Lock()]
+            with self.lock: self.conns.append(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+    def _serve(self, conn):
+        c, buf = conn[0], bytearray()
+        while True:
+            try: chunk = c.recv(262144)
+            except OSError: chunk = b""
+            if not chunk: break
+            buf += chunk; out = []
+            *lines, rest = buf.split(b"\n"); buf = bytearray(rest)
+            for line in lines:
+                if not line.strip(): continue
+                try: req = json.loads(line)
+                except ValueError: out.append({"error": "invalid parameter"}); continue
+                if self.latency: time.sleep(self.latency)
+                res = self._handle(conn, req.get("command") or [])
+                if "request_id" in req: res["request_id"] = req["request_id"]
+                out.append(res)
+            if out: self._send(conn, out)
+        with self.lock:
+            if conn in self.conns: self.conns.remove(conn)
+        try: c.close()
+        except OSError: pass
+    def _send(self, conn, msgs):
+        try:
+            with conn[2]: conn[0].sendall("".join(json.dumps(m) + "\n" for m in msgs).encode())
+        except OSError: pass
+    def _emit(self, event, **kv):
+        with self.lock: conns = list(self.conns)
+        for conn in conns: self._send(conn, [dict(kv, event=event)])
+    def _prop(self, name):
+        pl, pos = self.playlist, self.pos
+        cur = pl[pos] if 0 <= pos < len(pl) else None
+        if name == "playlist": return True, [dict(e, current=True, playing=True) if k == pos else e for k, e in enumerate(pl)]
+        if name == "playlist-count": return True, len(pl)
+        if name in ("playlist-pos", "playlist-playing-pos"): return True, pos
+        if name == "pause": return True, self.pause
+        if name == "volume": return True, self.volume
+        if name == "idle-active": return True, cur is None
+        if name in ("path", "filename"): return cur is not None, cur and cur["filename"]
+        if name == "media-title": return cur is not None, cur and (cur.get("title") or os.path.basename(cur["filename"]))
+        if name.startswith("playlist/"):
+            parts = name.split("/")
+            if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < len(pl): k = int(parts[1]); return True, dict(pl[k], current=k == pos, playing=k == pos)
+            if len(parts) == 3 and parts[1].isdigit() and int(parts[1]) < len(pl):
+                e = pl[int(parts[1])]
+                if parts[2] == "filename": return True, e["filename"]
+                if parts[2] == "title": return "title" in e, e.get("title")
+                if parts[2] in ("current", "playing"): return True, int(parts[1]) == pos
+        return False, None
+    def _changed(self, started=False):
+        if started:
+            self._emit("start-file"); delay = self.startup * (0.25 if self.warm else 1.0)
+            if delay: threading.Timer(delay, self._emit, ("playback-restart",)).start()
+            else: self._emit("playback-restart")
+        with self.lock: conns = list(self.conns)
+        for conn in conns:
+            msgs = []
+            with self.lock:
+                for oid, (name, last) in list(conn[1].items()):
+                    ok, val = self._prop(name)
+                    if val != last: conn[1][oid] = (name, val); msgs.append({"event": "property-change", "id": oid, "name": name, "data": val if ok else None})
+            if msgs: self._send(conn, msgs)
+    def _handle(self, conn, cmd):
+        self.requests += 1
+        if not cmd: return {"error": "invalid parameter"}
+        op, args, changed, started = cmd[0], cmd[1:], False, False
+        with self.lock:
+            pl, old = self.playlist, self.pos
+            if op == "get_property" and args:
+                ok, val = self._prop(args[0])
+                return {"data": val, "error": "success"} if ok else {"error": "property unavailable"}
+            elif op in ("set_property", "set") and len(args) == 2:
+                name, val = args
+                if name == "pause": self.pause, changed = bool(val) if not isinstance(val, str) else val == "yes", True
+                elif name == "volume": self.volume, changed = float(val), True
+                elif name == "playlist-pos" and -1 <= int(val) < len(pl): self.pos, changed, started = int(val), True, int(val) >= 0
+                elif name in OPTIONS: self.options[name] = val
+                else: return {"error": "property unavailable"}
+            elif op == "cycle" and args and args[0] == "pause": self.pause, changed = not self.pause, True
+            elif op == "playlist-play-index" and args:
+                i = self.pos if args[0] == "current" else -1 if args[0] == "none" else int(args[0])
+                if not -1 <= i < len(pl): return {"error": "invalid parameter"}
+                self.pos, changed, started = i, True, i >= 0
+            elif op == "playlist-move" and len(args) == 2:
+                a, b = int(args[0]), int(args[1])
+                if not (0 <= a < len(pl) and 0 <= b <= len(pl)): return {"error": "invalid parameter"}
+                if a != b and a + 1 != b:
+                    pl.insert(b if b < a else b - 1, pl.pop(a))
+                    if self.pos >= 0: self.pos = self._index_of(a, b)
+                    changed = True
+            elif op == "playlist-remove" and args:
+                i = self.pos if args[0] == "current" else int(args[0])
+                if not 0 <= i < len(pl): return {"error": "invalid parameter"}
+                del pl[i]
+                if i < self.pos: self.pos -= 1
+                elif i == self.pos: self.pos, started = (min(i, len(pl) - 1) if pl else -1), bool(pl)
+                changed = True
+            elif op == "playlist-clear":
+                cur = pl[self.pos] if self.pos >= 0 else None
+                self.playlist, self.pos, changed = ([cur] if cur else []), (0 if cur else -1), True
+            elif op in ("loadlist", "loadfile") and args:
+                mode = args[1] if len(args) > 1 else "replace"
+                if op == "loadlist":
+                    try: new = read_m3u(args[0])
+                    except OSError: return {"error": "loading failed"}
+                else: new = [{"filename": args[0]}]
+                if mode in ("append", "append-play"):
+                    pl.extend(new)
+                    if self.pos < 0 and new and mode == "append-play": self.pos, started = 0, True
+                else: self.playlist, self.pos, started = new, (0 if new else -1), bool(new)
+                changed = True
+            elif op == "observe_property" and len(args) == 2:
+                conn[1][args[0]] = (args[1], object()); changed = True
+            elif op == "unobserve_property" and args:
+                if conn[1].pop(args[0], None) is None: return {"error": "invalid parameter"}
+            elif op in ("client_name", "get_version"): return {"data": "fake-mpv" if op == "client_name" else 1, "error": "success"}
+            elif op in ("show-text", "print-text", "quit", "stop", "playlist-next", "playlist-prev", "seek"):
+                if op in ("playlist-next", "playlist-prev") and pl:
+                    self.pos, changed, started = (self.pos + (1 if op == "playlist-next" else -1)) % len(pl), True, True
+            else: return {"error": "invalid parameter"}
+        if changed:
+            with self.lock:
+                if started: self.warm = self.options.get("prefetch-playlist") in ("yes", True) and self.pos == old + 1
+                self.starting = self.starting or started
+            self.wake.set()
+        return {"error": "success"}
+    def _index_of(self, a, b):
+        p = self.pos
+        if p == a: return b if b < a else b - 1
+        if a < p < b: return p - 1
+        if b <= p < a: return p + 1
+        return p
+def main():
+    ap = argparse.ArgumentParser(description="Stand-in for mpv's JSON IPC server")
+    ap.add_argument("path", nargs="?", default="/tmp/mpvsocket-fake"); ap.add_argument("-n", type=int, default=1000)
+    ap.add_argument("--latency", type=float, default=0.0); ap.add_argument("--startup", type=float, default=0.0); ap.add_argument("--m3u")
+    a = ap.parse_args()
+    srv = FakeMPV(a.path, a.n, a.latency, read_m3u(a.m3u) if a.m3u else None, a.startup).start(); print(f"fake mpv on {a.path} with {len(srv.playlist)} entries", flush=True)
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt: srv.stop()
+if __name__ == "__main__": main()
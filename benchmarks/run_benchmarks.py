@@ -0,0 +1,311 @@
+import sys, os, json, time, random, tempfile, platform, statistics, argparse, threading, subprocess
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE)); sys.path.insert(0, HERE)
+import m3u, mpv_ipc, epg, gzip
+from playlist_store import EntryStore, GroupIndex, sort_entries
+from playlist_search import SearchIndex
+from playlist_reorder import plan_moves, apply_moves
+from playlist_sync import fetch_playlist
+from mpv_discovery import SocketDiscovery
+from fake_mpv import FakeMPV
+from stream_health import HealthStore, HealthProber
+from zap import ZapTracker, Prewarmer, EVENTS as ZAP_EVENTS
+from logo_cache import LogoCache
+import view_snapshot, remote_m3u, playlist_merge
+import fake_http
+WORDS = ("news", "sport", "movie", "kids", "music", "docu", "world", "cinema", "live", "drama", "comedy", "nature", "retro", "action", "series", "local")
+def write_m3u(path, n, groups=300, seed=1):
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("#EXTM3U\n")
+        for i in range(n):
+            name = f"{rnd.choice(WORDS).title()} {rnd.choice(WORDS).title()} {i}"
+            f.write(f'#EXTINF:-1 tvg-id="ch{i}" tvg-logo="http://logo.example/{i}.png" group-title="Group {rnd.randrange(groups)}",{name}\nhttp://host{i % 50}.example/live/{i}.ts\n')
+    return path
+def write_source(path, n, k, step):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("#EXTM3U\n")
+        for i in range(k * step, k * step + n):
+            url = (f"HTTP://Shared.example:80/live/{i}.ts" if k % 2 else f"http://shared.example/live/{i}.ts") if i % 2 == 0 else f"http://prov{k}.example/{i}.ts"
+            tid = f' tvg-id="ch{i}"' if i % 3 else ""
+            f.write(f'#EXTINF:-1{tid} group-title="{"GROUP" if k % 2 else "Group"} {i % 300}",Channel {i}\n{url}\n')
+    return path
+def write_xmltv(path, channels, per, seed=1):
+    rnd, base = random.Random(seed), int(time.time()) // 3600 * 3600 - 6 * 3600
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<tv>\n')
+        for c in range(channels): f.write(f'<channel id="ch{c}"><display-name>Channel {c}</display-name></channel>\n')
+        for c in range(channels):
+            t = base
+            for k in range(per):
+                d = rnd.choice((900, 1800, 3600))
+                f.write(f'<programme start="{time.strftime("%Y%m%d%H%M%S", time.gmtime(t))} +0000" stop="{time.strftime("%Y%m%d%H%M%S", time.gmtime(t + d))} +0000" channel="ch{c}"><title lang="en">{rnd.choice(WORDS).title()} {k % 50}</title><desc>{" ".join(rnd.choice(WORDS) for _ in range(12))}</desc></programme>\n')
+                t += d
+        f.write("</tv>\n")
+    return path
+class Runner:
+    def __init__(self, repeat): self.repeat, self.results = repeat, []
+    def run(self, name, n, fn, setup=None, repeat=None):
+        runs = []
+        for _ in range(repeat or self.repeat):
+            if setup: setup()
+            t = time.perf_counter(); fn(); runs.append(time.perf_counter() - t)
+        r = {"name": name, "n": n, "best": min(runs), "median": statistics.median(runs), "runs": runs}
+        self.results.append(r); print(f"{name:<22} {n:>8} {r['best'] * 1000:10.2f} ms", file=sys.stderr, flush=True)
+        return r
+    def skip(self, name, n, why):
+        self.results.append({"name": name, "n": n, "skipped": why}); print(f"{name:<22} {n:>8}   skipped: {why}", file=sys.stderr, flush=True)
+def bench_parse(r, n, path):
+    r.run("m3u_parse", n, lambda: m3u.load(path, use_cache=False))
+    m3u.write_cache(path, m3u.load(path, use_cache=False))
+    r.run("m3u_cache_load", n, lambda: m3u.load(path))
+def bench_update(r, n, entries, tmp, latency, max_reorder):
+    pl = [{"filename": e.url, "title": e.name} for e in entries]
+    groups = {e.url: e.group for e in entries}
+    srv = FakeMPV(os.path.join(tmp, f"mpv-{n}.sock"), playlist=pl, latency=latency).start()
+    client = mpv_ipc.MPVClient(srv.path, 5.0)
+    try:
+        client.wait_connected()
+        r.run("playlist_fetch", n, lambda: fetch_playlist(client, timeout=120.0))
+        r.run("playlist_fetch_preview", n, lambda: fetch_playlist(client, on_page=lambda a, part: None, timeout=120.0))
+        items = fetch_playlist(client, timeout=120.0)
+        favs = {e.name for e in entries[::97]}; group = entries[len(entries) // 2].group if entries else "All"
+        def build():
+            store = EntryStore()
+            for fn, t in items: store.add(t, fn, groups.get(fn, "Uncategorized"))
+            return store
+        r.run("entry_store_build", n, build)
+        store = build()
+        r.run("update_sort", n, lambda: sort_entries(store.entries, favs, group))
+        order = [x.orig_idx for x in sort_entries(store.entries, favs, group)]
+        r.run("plan_moves", n, lambda: plan_moves(order))
+        moves = plan_moves(order)
+        if n > max_reorder: r.skip("apply_moves", n, f"above --max-reorder {max_reorder}")
+        else:
+            r.run("apply_moves", n, lambda: apply_moves(client, moves, timeout=120.0), setup=lambda: srv.load(pl), repeat=1)
+            if [e["filename"] for e in srv.playlist] != [items[k][0] for k in order]: raise SystemExit("apply_moves produced the wrong order")
+        return store.entries, favs, group
+    finally: client.close(); srv.stop()
+def bench_search(r, n, entries):
+    base = SearchIndex()
+    r.run("search_index_build", n, lambda: SearchIndex().attach(entries))
+    ix = base.attach(entries); query = "sport news 1"
+    def typing():
+        ix.last_q = ix.last_ids = None
+        for k in range(1, len(query) + 1): ix.search(query[:k])
+    r.run("search_typing", n, typing)
+    r.run("search_fuzzy", n, lambda: ix.search("sport nwes", fuzzy=True))
+def bench_groups(r, n, entries, favs, group):
+    r.run("group_index_build", n, lambda: GroupIndex(entries, favs).counts())
+    gi = GroupIndex(entries, favs)
+    r.run("group_filter", n, lambda: (gi.positions(group), gi.positions("★ Favorites"), gi.groups()))
+def bench_discovery(r, tmp, k):
+    d = os.path.join(tmp, f"disc{k}"); os.makedirs(d, exist_ok=True)
+    srvs = [FakeMPV(os.path.join(d, f"mpvsocket{i}"), 1).start() for i in range(k)]
+    try:
+        done = threading.Event()
+        def run():
+            done.clear(); disc = SocketDiscovery(lambda cur: len(cur) == k and done.set(), patterns=(os.path.join(d, "mpvsocket*"),)).start()
+            done.wait(30); disc.stop()
+        r.run("socket_discovery", k, run)
+    finally:
+        for s in srvs: s.stop()
+def bench_health(r, tmp, n):
+    srv, base = fake_http.serve(); urls = fake_http.urls(base, n)
+    try:
+        for name, kw in (("stream_health_probe", {}), ("stream_health_probe_h64", {"per_host": 64})):
+            store = HealthStore(os.path.join(tmp, f"{name}-{n}.json"))
+            r.run(name, n, lambda: HealthProber(store, **kw).check(urls).join(), repeat=1)
+            wrong = sum(store.alive(u) != fake_http.expected(i) for i, u in enumerate(urls))
+            if wrong: raise SystemExit(f"stream health prober misjudged {wrong} urls")
+    finally: srv.shutdown()
+def bench_zap(r, tmp, n, startup):
+    pl = [{"filename": f"http://host{i % 8}.example/live/{i}.ts", "title": f"Channel {i}"} for i in range(max(n, 2) * 2)]
+    srv = FakeMPV(os.path.join(tmp, "mpv-zap.sock"), playlist=pl, startup=startup).start()
+    client, zap, done = mpv_ipc.MPVClient(srv.path, 5.0), ZapTracker(window=n), threading.Event()
+    for e in ZAP_EVENTS: client.on_event(e, lambda ev: zap.on_event(ev) and done.set())
+    def zaps(targets):
+        for i in targets:
+            done.clear(); zap.begin(pl[i]["filename"], "Group %d" % (i % 3))
+            fut = client.pipeline([{"command": ["set_property", "playlist-pos", i]}, {"command": ["set_property", "pause", False]}])[0]
+            fut.add_done_callback(lambda f, url=pl[i]["filename"]: zap.ack(url, f.result()))
+            if not done.wait(5.0 + startup * 4): raise SystemExit(f"zap to {i} never reached playback-restart")
+    def run(name, targets, prefetch, note=None):
+        client.command({"command": ["set_property", "prefetch-playlist", "yes" if prefetch else "no"]})
+        zap.reset(); res = r.run(name, n, lambda: zaps(targets), repeat=1)
+        s = [row for row in zap.rows() if row[0] == "host"]; cnt = sum(row[2] for row in s)
+        res.update(zap_mean=sum(row[2] * row[3] for row in s) / cnt if cnt else 0.0, zap_p95=max((row[5] for row in s), default=0.0), zap=zap.snapshot()["stats"])
+        print(f"{'':<22} {'':>8}   zap mean {res['zap_mean'] * 1000:.1f} ms  worst host p95 {res['zap_p95'] * 1000:.1f} ms", file=sys.stderr, flush=True)
+        if note: res["note"] = note; print(f"{'':<22} {'':>8}   {note}", file=sys.stderr, flush=True)
+    try:
+        client.wait_connected()
+        rnd = random.Random(3)
+        run("zap_random", [rnd.randrange(len(pl)) for _ in range(n)], False)
+        run("zap_next_cold", list(range(1, n + 1)), False)
+        run("zap_next_prefetch_fake", list(range(1, n + 1)), True, "sanity check: fake mpv warms the next entry at a fixed 0.25x start-up")
+        if Prewarmer().prefetch(client)[0] is None: raise SystemExit("fake mpv rejected prefetch options")
+    finally: client.close(); srv.stop()
+def bench_logos(r, tmp, n, rows=40):
+    srv, base = fake_http.serve(delay=0.002); urls = [f"{base}/logo/{i}.png" for i in range(n)]
+    decode = lambda data, size: (size, len(data)) if data[:8] == b"\x89PNG\r\n\x1a\n" else None
+    make = lambda: LogoCache(decode, mem=rows * 10, disk=256 << 10, path=os.path.join(tmp, "logos"))
+    def fill(cache, k):
+        w = urls[k:k + rows]; cache.request(w); end = time.monotonic() + 30
+        while any(cache.get(u) is None and u not in cache.failed for u in w):
+            if time.monotonic() > end: raise SystemExit(f"logos {k}..{k + rows} never arrived")
+            time.sleep(0.001)
+        bad = sum((cache.get(u) is None) == fake_http.logo_ok(k + j) for j, u in enumerate(w))
+        if bad: raise SystemExit(f"logo cache misjudged {bad} of {len(w)} logos")
+    try:
+        cache = make()
+        r.run("logo_viewport_net", rows, lambda: fill(cache, 0), repeat=1)
+        r.run("logo_viewport_disk", rows, lambda: fill(make(), 0), repeat=1)
+        calls = []
+        def scroll():
+            for k in range(0, n - rows, rows // 2):
+                t = time.perf_counter(); cache.request(urls[k:k + rows]); calls.append(time.perf_counter() - t)
+        res = r.run("logo_scroll", n, scroll, repeat=1); calls.sort()
+        res.update(request_p99=calls[int(len(calls) * 0.99)] if calls else 0.0, request_max=calls[-1] if calls else 0.0)
+        print(f"{'':<22} {'':>8}   per-frame request p99 {res['request_p99'] * 1e6:.0f} µs  max {res['request_max'] * 1e6:.0f} µs", file=sys.stderr, flush=True)
+        fill(cache, n - rows); time.sleep(0.2)
+        if len(cache.images) > cache.mem: raise SystemExit(f"logo memory cache grew to {len(cache.images)} > {cache.mem}")
+        used = cache._scan()[1]
+        if used > cache.disk * 1.1: raise SystemExit(f"logo disk cache grew to {used} > {cache.disk}")
+    finally: srv.shutdown()
+def bench_remote(r, n):
+    srv, base = fake_http.serve(); url = f"{base}/playlist/{n}.m3u"
+    def get(want):
+        local, entries, changed = remote_m3u.fetch(url)
+        if changed != want or len(entries) != n: raise SystemExit(f"remote playlist: changed={changed} entries={len(entries)}, expected {want}/{n}")
+        if want and not all("://" in e.url for e in entries): raise SystemExit("remote playlist kept relative urls")
+    try:
+        r.run("remote_fetch", n, lambda: get(True), repeat=1)
+        r.run("remote_revalidate", n, lambda: get(False))
+    finally: srv.shutdown()
+def bench_merge(r, tmp, n, k=5):
+    step = n // 5; paths = [write_source(os.path.join(tmp, f"source-{j}.m3u"), n, j, step) for j in range(k)]
+    lists = [m3u.load(p) for p in paths]
+    res = r.run("merge_index", n * k, lambda: playlist_merge.merge(zip(paths, lists)))
+    r.run("merge_load_write", n * k, lambda: playlist_merge.load(paths), repeat=1)
+    entries, stats = playlist_merge.merge(zip(paths, lists)); want = n + (k - 1) * step
+    if len(entries) != want or len({e.group for e in entries}) != 300: raise SystemExit(f"merge kept {len(entries)} entries in {len({e.group for e in entries})} groups, expected {want} in 300")
+    print(f"{'':<22} {'':>8}   dropped {sum(s.dup_url for s in stats)} by url, {sum(s.dup_channel for s in stats)} by tvg-id/name", file=sys.stderr, flush=True)
+    return res
+def bench_epg(r, tmp, n):
+    channels = max(1, n // 48); path = write_xmltv(os.path.join(tmp, f"epg-{n}.xml.gz"), channels, 48)
+    r.run("epg_ingest", n, lambda: epg.load(path, use_cache=False), repeat=1)
+    r.run("epg_cache_load", n, lambda: epg.load(path))
+    g, keys = epg.load(path), [f"ch{c}" for c in range(channels)]
+    r.run("epg_now_lookup", 10000, lambda: [g.title_now(keys[k % channels]) for k in range(10000)])
+def bench_qt(r, n, entries):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PySide6.QtWidgets import QApplication
+        from PySide6.QtCore import Qt
+        from playlist_qt import PlaylistModel
+    except ImportError as e: return r.skip("qt_model_refresh", n, str(e))
+    app = QApplication.instance() or QApplication([])
+    owner = type("Owner", (), {"favorites": set(), "is_paused": False, "current_playing_filename": "", "USER_ROLE": Qt.UserRole, "guide": None, "dead_urls": frozenset(), "logos": None, "url_to_logo": {}})()
+    model = PlaylistModel(owner)
+    def refresh():
+        model.set_rows(entries)
+        for row in range(min(100, len(entries))): model.data(model.index(row), Qt.DisplayRole)
+        app.processEvents()
+    r.run("qt_model_refresh", n, refresh)
+def bench_gtk(r, n, entries):
+    try:
+        import gi
+        gi.require_version('Gtk', '3.0')
+        from gi.repository import Gtk
+    except (ImportError, ValueError) as e: return r.skip("gtk_store_refresh", n, str(e))
+    store = Gtk.ListStore(int)
+    def refresh():
+        store.clear()
+        for pos in range(len(entries)): store.append([pos])
+    r.run("gtk_store_refresh", n, refresh)
+STARTUP = """
+import sys, time; t0 = time.perf_counter(); sys.path.insert(0, sys.argv[1])
+import os, m3u, mpv_ipc, epg, view_snapshot, stream_health, library_db, zap, player_registry, playlist_search, mpv_discovery
+from playlist_store import EntryStore, sort_entries
+from playlist_sync import fetch_playlist
+if sys.argv[2] == "snapshot": rows = view_snapshot.load(sys.argv[3]).shown
+else:
+    entries = m3u.load(sys.argv[3]); groups = {e.url: e.group for e in entries}
+    c = mpv_ipc.MPVClient(sys.argv[4], 5.0); c.wait_connected(); store = EntryStore()
+    for fn, t in fetch_playlist(c, timeout=120.0): store.add(t or os.path.basename(fn), fn, groups.get(fn, "Uncategorized"))
+    rows = sort_entries(store.entries, set())
+print(f"{len(rows)} {time.perf_counter() - t0}")
+"""
+def bench_startup(r, tmp, n, entries, path):
+    snap, env = os.path.join(tmp, f"startup-{n}.snap"), dict(os.environ, XDG_CACHE_HOME=os.path.join(tmp, "xdg"))
+    store = EntryStore()
+    for e in entries: store.add(e.name, e.url, e.group)
+    view_snapshot.save(snap, store.entries, range(len(store.entries)), set(), playlist=path, group="All")
+    srv = FakeMPV(os.path.join(tmp, f"mpv-startup-{n}.sock"), playlist=[{"filename": e.url, "title": e.name} for e in entries]).start()
+    root = os.path.dirname(HERE)
+    try:
+        subprocess.run([sys.executable, "-c", STARTUP, root, "cold", path, srv.path], env=env, check=True, capture_output=True)
+        for mode, src in (("cold", path), ("snapshot", snap)):
+            out = []
+            res = r.run(f"startup_{mode}", n, lambda: out.append(subprocess.run([sys.executable, "-c", STARTUP, root, mode, src, srv.path], env=env, check=True, capture_output=True, text=True).stdout.split()))
+            rows, first = int(out[-1][0]), min(float(o[1]) for o in out)
+            if rows != n: raise SystemExit(f"startup_{mode} produced {rows} rows, expected {n}")
+            res["first_rows"] = first; print(f"{'':<22} {'':>8}   rows ready {first * 1000:.1f} ms after interpreter start", file=sys.stderr, flush=True)
+    finally: srv.stop()
+    bench_startup_ui(r, tmp, n, store.entries, path)
+def bench_startup_ui(r, tmp, n, entries, path):
+    for kind, mod, probe in (("qt", "playlist_qt", "PySide6.QtWidgets"), ("gtk", "playlist_gtk", "gi")):
+        name = f"startup_{kind}_first_paint"
+        try: __import__(probe)
+        except ImportError as e: r.skip(name, n, str(e)); continue
+        if os.path.exists("/dev/shm/mpvsocket"): r.skip(name, n, "/dev/shm/mpvsocket is in use"); continue
+        home = os.path.join(tmp, f"home-{kind}"); os.makedirs(home, exist_ok=True)
+        env = dict(os.environ, HOME=home, XDG_CACHE_HOME=os.path.join(home, ".cache"), QT_QPA_PLATFORM="offscreen", MPV_PM_STARTUP_PROBE="1")
+        with open(os.path.join(home, f".mpv_{kind}_config.json"), "w", encoding="utf-8") as f: json.dump({"last_playlist_path": path, "current_group": "All"}, f)
+        m3u.CACHE_DIR, saved = os.path.join(home, ".cache", "mpv-playlistmanager"), m3u.CACHE_DIR
+        view_snapshot.save(view_snapshot.default_path(kind, "/dev/shm/mpvsocket"), entries, range(len(entries)), set(), playlist=path, group="All")
+        m3u.CACHE_DIR = saved
+        srv = FakeMPV("/dev/shm/mpvsocket", playlist=[{"filename": e.filename, "title": e.name} for e in entries]).start(); out = []
+        try: res = r.run(name, n, lambda: out.append(subprocess.run([sys.executable, os.path.join(os.path.dirname(HERE), f"{mod}.py")], env=env, capture_output=True, text=True, timeout=60).stdout), repeat=1)
+        finally: srv.stop()
+        line = next((l for l in out[-1].splitlines() if l.startswith("first-paint")), None)
+        if line: res["first_paint"] = float(line.split()[1]) / 1000; print(f"{'':<22} {'':>8}   {line}", file=sys.stderr, flush=True)
+def compare(old, new):
+    prev = {(x["name"], x["n"]): x for x in old.get("results", []) if "best" in x}
+    for x in new["results"]:
+        p = prev.get((x["name"], x["n"]))
+        if p and "best" in x: print(f"{x['name']:<22} {x['n']:>8} {p['best'] * 1000:10.2f} -> {x['best'] * 1000:10.2f} ms  x{x['best'] / p['best'] if p['best'] else float('inf'):.2f}")
+def main():
+    ap = argparse.ArgumentParser(description="Offline benchmarks against a fake mpv IPC server")
+    ap.add_argument("--sizes", default="1000,10000,100000,500000"); ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--latency", type=float, default=0.0); ap.add_argument("--max-reorder", type=int, default=100000)
+    ap.add_argument("--sockets", type=int, default=16); ap.add_argument("--probe-urls", type=int, default=2000); ap.add_argument("--epg-programmes", type=int, default=100000); ap.add_argument("--no-ui", action="store_true"); ap.add_argument("--no-startup", action="store_true")
+    ap.add_argument("--logos", type=int, default=50000); ap.add_argument("--zaps", type=int, default=100); ap.add_argument("--startup", type=float, default=0.05); ap.add_argument("--remote", type=int, default=100000); ap.add_argument("--merge", type=int, default=100000)
+    ap.add_argument("-o", "--out"); ap.add_argument("--compare")
+    a = ap.parse_args()
+    r = Runner(a.repeat)
+    with tempfile.TemporaryDirectory(prefix="mpv-bench-") as tmp:
+        m3u.CACHE_DIR = os.path.join(tmp, "cache")
+        for n in [int(s) for s in a.sizes.split(",") if s.strip()]:
+            path = write_m3u(os.path.join(tmp, f"synthetic-{n}.m3u"), n)
+            bench_parse(r, n, path)
+            entries = m3u.load(path)
+            store_entries, favs, group = bench_update(r, n, entries, tmp, a.latency, a.max_reorder)
+            bench_search(r, n, store_entries)
+            bench_groups(r, n, store_entries, favs, group)
+            if not a.no_ui: bench_qt(r, n, store_entries); bench_gtk(r, n, store_entries)
+            if not a.no_startup: bench_startup(r, tmp, n, entries, path)
+        bench_discovery(r, tmp, a.sockets)
+        if a.probe_urls: bench_health(r, tmp, a.probe_urls)
+        if a.epg_programmes: bench_epg(r, tmp, a.epg_programmes)
+        if a.logos: bench_logos(r, tmp, a.logos)
+        if a.remote: bench_remote(r, a.remote)
+        if a.merge: bench_merge(r, tmp, a.merge)
+        if a.zaps: bench_zap(r, tmp, a.zaps, a.startup)
+    out = {"meta": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": a.repeat, "latency": a.latency}, "results": r.results}
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as f: json.dump(out, f, indent=1)
+    else: print(json.dumps(out, indent=1))
+    if a.compare:
+        with open(a.compare, "r", encoding="utf-8") as f: compare(json.load(f), out)
+if __name__ == "__main__": main()
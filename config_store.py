@@ -0,0 +1,32 @@
+import os, json, threading, time
+class ConfigStore:
+    def __init__(self, path, delay=0.5):
+        self.path, self.delay = path, delay
+        self.data, self.lock, self.write_lock, self.dirty, self.written = {}, threading.Lock(), threading.Lock(), threading.Event(), None
+        threading.Thread(target=self._run, daemon=True).start()
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f: d = json.load(f)
+            if not isinstance(d, dict): d = {}
+        except (OSError, ValueError): d = {}
+        with self.lock: self.data = dict(d)
+        return d
+    def set(self, **kv):
+        with self.lock: self.data.update(kv)
+        self.dirty.set()
+    def _run(self):
+        while True:
+            self.dirty.wait(); time.sleep(self.delay); self.dirty.clear()
+            self.flush()
+    def flush(self):
+        with self.lock: blob = json.dumps(self.data)
+        with self.write_lock:
+            if blob == self.written: return
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f: f.write(blob); f.flush(); os.fsync(f.fileno())
+                os.replace(tmp, self.path); self.written = blob
+            except OSError:
+                try: os.unlink(tmp)
+                except OSError: pass
@@ -0,0 +1,126 @@
+import os, gzip, json, mmap, struct, hashlib, threading, time, calendar, bisect
+import xml.etree.ElementTree as ET
+from array import array
+import m3u
+EPG_VERSION = 1
+MAGIC = b"EPG1"
+def parse_time(s):
+    s = (s or "").strip()
+    if len(s) < 14 or not s[:14].isdigit(): return None
+    t = calendar.timegm((int(s[0:4]), int(s[4:6]), int(s[6:8]), int(s[8:10]), int(s[10:12]), int(s[12:14]), 0, 0, 0))
+    tz = s[14:].strip()
+    if len(tz) == 5 and tz[0] in "+-" and tz[1:].isdigit(): t -= (1 if tz[0] == "+" else -1) * (int(tz[1:3]) * 3600 + int(tz[3:5]) * 60)
+    return t
+def _open(path):
+    f = open(path, "rb")
+    if f.read(2) == b"\x1f\x8b": f.seek(0); return gzip.GzipFile(fileobj=f)
+    f.seek(0); return f
+def ingest(path):
+    chans, names, titles, title_id = {}, {}, [], {}
+    ch, st, sp, ti, times = array("i"), array("q"), array("q"), array("i"), {}
+    def when(v):
+        t = times.get(v, False)
+        if t is False:
+            t = times[v] = parse_time(v)
+            if len(times) > 65536: times.clear()
+        return t
+    with _open(path) as f:
+        it = ET.iterparse(f, events=("start", "end")); root = None
+        for ev, el in it:
+            if root is None: root = el
+            if ev != "end": continue
+            if el.tag == "programme":
+                cid, start, stop = el.get("channel") or "", when(el.get("start")), when(el.get("stop"))
+                if cid and start is not None:
+                    title = (el.findtext("title") or "").strip()
+                    k = chans.get(cid)
+                    if k is None: k = chans[cid] = len(chans)
+                    t = title_id.get(title)
+                    if t is None: t = title_id[title] = len(titles); titles.append(title)
+                    ch.append(k); st.append(start); sp.append(stop if stop is not None else start); ti.append(t)
+                root.clear()
+            elif el.tag == "channel":
+                cid = el.get("id") or ""
+                for dn in el.iter("display-name"):
+                    if dn.text: names.setdefault(m3u.normalize(dn.text), cid)
+                root.clear()
+    order = sorted(range(len(st)), key=lambda i: (ch[i], st[i]))
+    counts, spans, lo = [0] * len(chans), {}, 0
+    for k in ch: counts[k] += 1
+    for cid, k in sorted(chans.items(), key=lambda x: x[1]): spans[cid] = (lo, lo + counts[k]); lo += counts[k]
+    s2, p2, t2 = array("q", (st[i] for i in order)), array("q", (sp[i] for i in order)), array("i", (ti[i] for i in order))
+    return spans, names, s2, p2, t2, titles
+def _cache_path(path): return os.path.join(m3u.CACHE_DIR, hashlib.sha1(os.path.abspath(path).encode()).hexdigest() + ".epg")
+def _stamp(path):
+    st = os.stat(path); return [os.path.abspath(path), st.st_size, st.st_mtime_ns, EPG_VERSION]
+def write_index(out, stamp, spans, names, starts, stops, tids, titles):
+    blob = bytearray(); offs = array("I", [0])
+    for t in titles: blob += t.encode(); offs.append(len(blob))
+    head = json.dumps({"stamp": stamp, "n": len(starts), "titles": len(titles), "channels": spans, "names": names}).encode()
+    head += b" " * (-(len(head) + 8) % 8)
+    tmp = f"{out}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(head)) + head)
+        for a in (starts, stops, tids, offs): f.write(a.tobytes()); f.write(b"\0" * (-f.tell() % 8))
+        f.write(blob)
+    os.replace(tmp, out)
+class EPG:
+    def __init__(self, fn):
+        with open(fn, "rb") as f: self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:4] != MAGIC: raise ValueError("not an epg index")
+        hl = struct.unpack_from("<I", self.mm, 4)[0]; h = json.loads(self.mm[8:8 + hl])
+        self.stamp, n, nt, self.channels, self.names = h["stamp"], h["n"], h["titles"], {k: tuple(v) for k, v in h["channels"].items()}, h["names"]
+        mv, off = memoryview(self.mm), 8 + hl
+        def take(fmt, count, size):
+            nonlocal off
+            a = mv[off:off + count * size].cast(fmt); off += count * size; off += -off % 8
+            return a
+        self.starts, self.stops, self.tids, self.offs = take("q", n, 8), take("q", n, 8), take("i", n, 4), take("I", nt + 1, 4)
+        self.blob = off
+    def __len__(self): return len(self.starts)
+    def channel(self, key):
+        if key in self.channels: return key
+        return self.names.get(m3u.normalize(key))
+    def _title(self, i):
+        t = self.tids[i]; return self.mm[self.blob + self.offs[t]:self.blob + self.offs[t + 1]].decode("utf-8", "ignore")
+    def _prog(self, i): return (self.starts[i], self.stops[i], self._title(i))
+    def now_next(self, key, t=None):
+        cid = self.channel(key) if key else None
+        if cid is None: return None, None
+        lo, hi = self.channels[cid]
+        if t is None: t = time.time()
+        i = bisect.bisect_right(self.starts, t, lo, hi) - 1
+        cur = self._prog(i) if i >= lo and self.stops[i] > t else None
+        return cur, (self._prog(i + 1) if i + 1 < hi else None)
+    def title_now(self, key, t=None):
+        cur = self.now_next(key, t)[0]
+        return cur[2] if cur else ""
+def load(path, use_cache=True):
+    cp, stamp = _cache_path(path), _stamp(path)
+    if use_cache:
+        try:
+            e = EPG(cp)
+            if e.stamp == stamp: return e
+        except (OSError, ValueError, KeyError): pass
+    write_index(cp, stamp, *ingest(path))
+    return EPG(cp)
+def load_async(path, callback, use_cache=True):
+    def run():
+        try: e = load(path, use_cache)
+        except (OSError, ET.ParseError, EOFError): e = None
+        callback(path, e)
+    t = threading.Thread(target=run, daemon=True); t.start(); return t
+def tvg_map(entries):
+    d = {e.name: e.tvg_id for e in entries if e.tvg_id and e.name}
+    d.update((e.url, e.tvg_id) for e in entries if e.tvg_id)
+    return d
+def entry_key(tvg_ids, e): return tvg_ids.get(e.filename) or tvg_ids.get(e.name) or e.name
+def search_key(guide, tvg_ids):
+    if guide is None: return lambda e: e.name
+    memo, now = {}, time.time()
+    def key(e):
+        k = entry_key(tvg_ids, e); t = memo.get(k)
+        if t is None: t = memo[k] = guide.title_now(k, now)
+        return f"{e.name} {t}" if t else e.name
+    return key
@@ -0,0 +1,72 @@
+import os, time, queue, sqlite3, threading
+import m3u
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS favorites (name TEXT PRIMARY KEY, url TEXT NOT NULL DEFAULT '', added REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS favorites_url ON favorites(url);
+CREATE TABLE IF NOT EXISTS history (url TEXT PRIMARY KEY, name TEXT NOT NULL DEFAULT '', last_played REAL NOT NULL, count INTEGER NOT NULL DEFAULT 0);
+CREATE INDEX IF NOT EXISTS history_last ON history(last_played);
+CREATE INDEX IF NOT EXISTS history_count ON history(count);
+CREATE TABLE IF NOT EXISTS resume (url TEXT PRIMARY KEY, position REAL NOT NULL, duration REAL, updated REAL NOT NULL);
+"""
+_STOP = object()
+class LibraryDB:
+    def __init__(self, path=None, delay=0.3, batch=1000):
+        self.path, self.delay, self.batch = path or os.path.join(m3u.CACHE_DIR, "library.sqlite3"), delay, batch
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.read_lock, self.queue, self.cond, self.pending = threading.Lock(), queue.Queue(), threading.Condition(), 0
+        self.db = self._open(); self.db.executescript(SCHEMA)
+        self.favs = {n for n, in self.db.execute("SELECT name FROM favorites")}
+        threading.Thread(target=self._run, daemon=True).start()
+    def _open(self):
+        db = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL"); db.execute("PRAGMA synchronous=NORMAL")
+        return db
+    def _write(self, sql, args=()):
+        with self.cond: self.pending += 1
+        self.queue.put((sql, args))
+    def _run(self):
+        db = self._open()
+        while True:
+            item = self.queue.get()
+            if item is _STOP: break
+            time.sleep(self.delay); ops = [item]
+            while len(ops) < self.batch:
+                try: ops.append(self.queue.get_nowait())
+                except queue.Empty: break
+            stop = _STOP in ops; ops = [o for o in ops if o is not _STOP]
+            try:
+                db.execute("BEGIN")
+                for sql, args in ops: db.execute(sql, args)
+                db.execute("COMMIT")
+            except sqlite3.Error:
+                try: db.execute("ROLLBACK")
+                except sqlite3.Error: pass
+            with self.cond: self.pending -= len(ops); self.cond.notify_all()
+            if stop: break
+        db.close()
+    def flush(self, timeout=5.0):
+        with self.cond: return self.cond.wait_for(lambda: self.pending <= 0, timeout)
+    def close(self): self.flush(); self.queue.put(_STOP)
+    def favorites(self): return set(self.favs)
+    def is_favorite(self, name): return name in self.favs
+    def set_favorite(self, name, url="", on=True):
+        if on: self.favs.add(name); self._write("INSERT INTO favorites(name, url, added) VALUES(?, ?, ?) ON CONFLICT(name) DO UPDATE SET url=excluded.url", (name, url, time.time()))
+        else: self.favs.discard(name); self._write("DELETE FROM favorites WHERE name=?", (name,))
+    def toggle_favorite(self, name, url=""):
+        on = name not in self.favs; self.set_favorite(name, url, on); return on
+    def import_favorites(self, names):
+        for n in names:
+            if n not in self.favs: self.set_favorite(n)
+    def played(self, url, name=""):
+        if url: self._write("INSERT INTO history(url, name, last_played, count) VALUES(?, ?, ?, 1) ON CONFLICT(url) DO UPDATE SET name=excluded.name, last_played=excluded.last_played, count=count+1", (url, name, time.time()))
+    def set_resume(self, url, position, duration=None):
+        if not url: return
+        if position is None or position < 10 or (duration and position > duration - 15): self._write("DELETE FROM resume WHERE url=?", (url,))
+        else: self._write("INSERT OR REPLACE INTO resume(url, position, duration, updated) VALUES(?, ?, ?, ?)", (url, float(position), duration, time.time()))
+    def _query(self, sql, args=()):
+        with self.read_lock: return self.db.execute(sql, args).fetchall()
+    def resume(self, url):
+        r = self._query("SELECT position FROM resume WHERE url=?", (url,))
+        return r[0][0] if r else None
+    def recent(self, limit=200): return [u for u, in self._query("SELECT url FROM history ORDER BY last_played DESC LIMIT ?", (limit,))]
+    def most_played(self, limit=200): return [u for u, in self._query("SELECT url FROM history ORDER BY count DESC, last_played DESC LIMIT ?", (limit,))]
@@ -0,0 +1,111 @@
+import os, time, hashlib, asyncio, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, unquote
+import m3u
+import stream_health
+class LogoCache:
+    def __init__(self, decode, on_ready=None, size=24, mem=2000, disk=64 << 20, path=None, concurrency=16, per_host=4, timeout=8.0, limit=512 << 10):
+        self.decode, self.on_ready, self.size, self.mem, self.disk = decode, on_ready, size, mem, disk
+        self.dir = path or os.path.join(m3u.CACHE_DIR, "logos")
+        self.concurrency, self.per_host, self.timeout, self.limit = concurrency, per_host, timeout, limit
+        self.lock, self.images, self.failed, self.inflight, self.wanted = threading.Lock(), OrderedDict(), OrderedDict(), set(), set()
+        self.loop, self.sem, self.hosts, self.used = None, None, {}, None
+        self.decoder = ThreadPoolExecutor(max_workers=2)
+    def get(self, url):
+        with self.lock:
+            img = self.images.get(url)
+            if img is not None: self.images.move_to_end(url)
+            return img
+    def request(self, urls):
+        with self.lock:
+            self.wanted = {u for u in urls if u}
+            todo = [u for u in self.wanted if u not in self.images and u not in self.failed and u not in self.inflight]
+            self.inflight.update(todo)
+        if not todo: return 0
+        self._start().call_soon_threadsafe(self._spawn, todo)
+        return len(todo)
+    def _spawn(self, urls):
+        for u in urls: asyncio.ensure_future(self._load(u))
+    def _start(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True).start()
+            return self.loop
+    def _file(self, url): return os.path.join(self.dir, hashlib.sha1(url.encode("utf-8", "ignore")).hexdigest())
+    async def _load(self, url):
+        img, tried, loop = None, False, asyncio.get_running_loop()
+        try:
+            if self.sem is None: self.sem = asyncio.Semaphore(self.concurrency)
+            with self.lock: wanted = url in self.wanted
+            if not wanted: return
+            data = await loop.run_in_executor(self.decoder, self._read_disk, url)
+            if data is None:
+                host = urlsplit(url).netloc; h = self.hosts.get(host)
+                if h is None: h = self.hosts[host] = asyncio.Semaphore(self.per_host)
+                async with h, self.sem:
+                    with self.lock: wanted = url in self.wanted
+                    if not wanted: return
+                    tried = True; data = await self._download(url)
+                if data: loop.run_in_executor(self.decoder, self._write_disk, url, data)
+            tried = True
+            if data: img = await loop.run_in_executor(self.decoder, self.decode, data, self.size)
+        except Exception: img = None
+        finally:
+            with self.lock:
+                self.inflight.discard(url)
+                if img is not None:
+                    self.images[url] = img
+                    while len(self.images) > self.mem: self.images.popitem(last=False)
+                elif tried:
+                    self.failed[url] = time.monotonic()
+                    while len(self.failed) > self.mem * 4: self.failed.popitem(last=False)
+        if img is not None and self.on_ready: self.on_ready(url)
+    async def _download(self, url):
+        u = urlsplit(url); scheme = u.scheme.lower()
+        if scheme in ("", "file"): return await asyncio.get_running_loop().run_in_executor(self.decoder, self._read_local, unquote(u.path) if scheme else url)
+        if scheme not in ("http", "https"): return None
+        status, hdr, body = await stream_health.fetch(url, self.timeout, self.limit)
+        if status != 200 or (hdr.get("content-length", "").isdigit() and int(hdr["content-length"]) > self.limit): return None
+        return body
+    def _read_local(self, p):
+        if os.path.getsize(p) > self.limit: return None
+        with open(p, "rb") as f: return f.read(self.limit)
+    def _read_disk(self, url):
+        fn = self._file(url)
+        try:
+            with open(fn, "rb") as f: data = f.read()
+            os.utime(fn)
+            return data
+        except OSError: return None
+    def _write_disk(self, url, data):
+        fn = self._file(url); tmp = f"{fn}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            with open(tmp, "wb") as f: f.write(data)
+            os.replace(tmp, fn)
+        except OSError: return
+        if self.used is None: self.used = self._scan()[1]
+        with self.lock: self.used += len(data); over = self.used > self.disk
+        if over: self.prune()
+    def _scan(self):
+        files = []
+        try:
+            with os.scandir(self.dir) as it:
+                for e in it:
+                    try: st = e.stat(); files.append((st.st_mtime, st.st_size, e.path))
+                    except OSError: pass
+        except OSError: pass
+        return files, sum(f[1] for f in files)
+    def prune(self, target=0.8):
+        files, used = self._scan(); files.sort()
+        for _, size, fn in files:
+            if used <= self.disk * target: break
+            try: os.unlink(fn); used -= size
+            except OSError: pass
+        with self.lock: self.used = used
+    def forget_failures(self):
+        with self.lock: self.failed.clear()
+    def clear(self):
+        with self.lock: self.images.clear(); self.failed.clear()
@@ -0,0 +1,63 @@
+import os, sys, re, pickle, zlib, hashlib, threading
+from collections import namedtuple
+M3UEntry = namedtuple("M3UEntry", "url name group tvg_id logo duration")
+ATTR_RE = re.compile(r'([A-Za-z0-9_-]+)="([^"]*)"')
+DUR_RE = re.compile(r'\s*(-?\d+(?:\.\d+)?)')
+NORM_RE = re.compile(r'\W+')
+CACHE_VERSION = 1
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "mpv-playlistmanager")
+def is_url(s): return bool(s) and s.lower().startswith(("http://", "https://"))
+def normalize(s): return NORM_RE.sub("", s).lower() if s else ""
+def parse_extinf(line):
+    body = line[8:] if line.startswith("#EXTINF:") else line[7:]
+    attrs, end = {}, 0
+    for m in ATTR_RE.finditer(body): attrs[m.group(1).lower()] = m.group(2); end = m.end()
+    c = body.find(",", end); dm = DUR_RE.match(body)
+    return (float(dm.group(1)) if dm else -1.0), attrs, (body[c + 1:].strip() if c >= 0 else "")
+def iter_entries(lines):
+    info, grp = None, None
+    for line in lines:
+        line = line.strip()
+        if not line: continue
+        if line[0] == "#":
+            if line.startswith("#EXTINF"): info, grp = parse_extinf(line), None
+            elif line.startswith("#EXTGRP:"): grp = line[8:].strip()
+            continue
+        if info:
+            dur, attrs, name = info
+            yield M3UEntry(line, name, sys.intern(attrs.get("group-title") or grp or "Uncategorized"), attrs.get("tvg-id", ""), attrs.get("tvg-logo", ""), dur)
+        else: yield M3UEntry(line, "", sys.intern(grp or "Uncategorized"), "", "", -1.0)
+        info, grp = None, None
+def resolve(path, url): return url if "://" in url or os.path.isabs(url) else os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(path)), url))
+def fingerprint(urls):
+    n, h = 0, 0
+    for u in urls: n += 1; h = (h + int.from_bytes(hashlib.blake2b(u.encode(errors="ignore"), digest_size=8).digest(), "little")) & 0xFFFFFFFFFFFFFFFF
+    return n, h
+def _cache_path(path): return os.path.join(CACHE_DIR, hashlib.sha1(os.path.abspath(path).encode()).hexdigest() + ".m3uc")
+def _stamp(path):
+    st = os.stat(path); return (os.path.abspath(path), st.st_size, st.st_mtime_ns, CACHE_VERSION)
+def read_cache(path):
+    try:
+        with open(_cache_path(path), "rb") as f: stamp, cols = pickle.loads(zlib.decompress(f.read()))
+        if stamp != _stamp(path): return None
+        return [M3UEntry._make(r) for r in zip(*cols)] if cols else []
+    except Exception: return None
+def write_cache(path, entries):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True); cp = _cache_path(path); tmp = f"{cp}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f: f.write(zlib.compress(pickle.dumps((_stamp(path), [list(c) for c in zip(*entries)]), pickle.HIGHEST_PROTOCOL), 1))
+        os.replace(tmp, cp)
+    except OSError: pass
+def load(path, use_cache=True):
+    if use_cache:
+        cached = read_cache(path)
+        if cached is not None: return cached
+    with open(path, "r", encoding="utf-8", errors="ignore") as f: entries = list(iter_entries(f))
+    if use_cache: write_cache(path, entries)
+    return entries
+def load_async(path, callback, use_cache=True):
+    def run():
+        try: entries = load(path, use_cache)
+        except OSError: entries = None
+        callback(path, entries)
+    t = threading.Thread(target=run, daemon=True); t.start(); return t
@@ -0,0 +1,71 @@
+import os, glob, time, threading, struct, select, fnmatch
+from concurrent.futures import ThreadPoolExecutor
+import mpv_ipc
+IN_CREATE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO = 0x100, 0x200, 0x40, 0x80
+def _inotify(dirs):
+    try:
+        import ctypes, ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0: return None
+        mask = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+        if not any([libc.inotify_add_watch(fd, d.encode(), mask) >= 0 for d in dirs if os.path.isdir(d)]): os.close(fd); return None
+        return fd
+    except Exception: return None
+class SocketDiscovery:
+    def __init__(self, on_change, patterns=("/dev/shm/mpvsocket*", "/tmp/mpvsocket*"), ttl=10.0, interval=5.0, timeout=0.3, workers=8):
+        self.on_change, self.patterns, self.ttl, self.interval, self.timeout = on_change, patterns, ttl, interval, timeout
+        self.cache, self.dead, self.lock, self.inflight = {}, {}, threading.Lock(), set()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.names = [os.path.basename(p) for p in patterns]
+        self.wake, self.stopped, self.last = threading.Event(), False, None
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+    def stop(self): self.stopped = True; self.wake.set()
+    def sockets(self):
+        with self.lock: return sorted((p, lbl) for p, (lbl, ts) in self.cache.items())
+    def rescan(self): self.wake.set()
+    def _run(self):
+        fd = _inotify(sorted({os.path.dirname(p) for p in self.patterns}))
+        if fd is not None: threading.Thread(target=self._watch, args=(fd,), daemon=True).start()
+        while not self.stopped:
+            self._scan()
+            self.wake.wait(self.interval); self.wake.clear()
+    def _watch(self, fd):
+        while not self.stopped:
+            try:
+                r, _, _ = select.select([fd], [], [], 1.0)
+                if not r: continue
+                data, off, hit = os.read(fd, 65536), 0, False
+            except OSError: break
+            while off + 16 <= len(data):
+                wd, mask, cookie, ln = struct.unpack_from("iIII", data, off)
+                name = data[off + 16:off + 16 + ln].rstrip(b"\0").decode(errors="ignore"); off += 16 + ln
+                if any(fnmatch.fnmatch(name, n) for n in self.names): hit = True
+            if hit: self.wake.set()
+        os.close(fd)
+    def _scan(self):
+        found, now = set(), time.monotonic()
+        for p in self.patterns: found.update(glob.glob(p))
+        with self.lock:
+            for p in [p for p in self.cache if p not in found]: del self.cache[p]
+            for p in [p for p in self.dead if p not in found]: del self.dead[p]
+            todo = [p for p in found if p not in self.inflight and now - self.cache.get(p, (None, self.dead.get(p, -1e9)))[1] >= self.ttl]
+            self.inflight.update(todo)
+        for p in todo: self.pool.submit(self._probe, p)
+        self._notify()
+    def _probe(self, path):
+        res = mpv_ipc.probe(path, {"command": ["get_property", "media-title"]}, self.timeout)
+        with self.lock:
+            self.inflight.discard(path)
+            if res is None: self.cache.pop(path, None); self.dead[path] = time.monotonic()
+            elif os.path.exists(path): self.cache[path] = (res.get("data") or os.path.basename(path), time.monotonic())
+        self._notify()
+    def _notify(self):
+        with self.lock:
+            cur = sorted((p, lbl) for p, (lbl, ts) in self.cache.items())
+            if cur == self.last: return
+            self.last = cur
+        try: self.on_change(cur)
+        except Exception: pass
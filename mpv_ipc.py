@@ -0,0 +1,154 @@
+import socket, json, threading, itertools, time
+from concurrent.futures import Future
+from perf_stats import STATS, command_name
+class MPVClient:
+    def __init__(self, path, timeout=0.5):
+        self.path, self.timeout = path, timeout
+        self.sock, self.lock, self.send_lock = None, threading.Lock(), threading.Lock()
+        self.pending, self.ids = {}, itertools.count(1)
+        self.event_handlers, self.observers, self.obs_ids = {}, {}, itertools.count(1)
+    def _connect(self):
+        with self.lock:
+            if self.sock: return self.sock
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                s.settimeout(self.timeout); s.connect(self.path); s.settimeout(None)
+            except OSError:
+                s.close(); raise
+            self.sock = s
+        threading.Thread(target=self._read_loop, args=(s,), daemon=True).start()
+        self._on_connect()
+        return s
+    def connect(self):
+        try: self._connect(); return True
+        except OSError: return False
+    def wait_connected(self, timeout=5.0, step=0.05):
+        end = time.monotonic() + timeout
+        while not self.connect():
+            if time.monotonic() >= end: return False
+            time.sleep(step)
+        return True
+    def _on_connect(self):
+        obs = list(self.observers.items())
+        if obs: self.pipeline([{"command": ["observe_property", i, n]} for i, (n, cb) in obs])
+    def _read_loop(self, s):
+        buf, start = bytearray(), 0
+        while True:
+            try: chunk = s.recv(262144)
+            except OSError: chunk = b""
+            if not chunk: break
+            scan = len(buf); buf += chunk
+            while True:
+                nl = buf.find(b"\n", scan)
+                if nl < 0: break
+                if nl > start: self._dispatch(bytes(buf[start:nl]))
+                start = scan = nl + 1
+            if start: del buf[:start]; start = 0
+        self._drop(s)
+    def _dispatch(self, line):
+        try: data = json.loads(line)
+        except ValueError: return
+        if not isinstance(data, dict): return
+        if data.get("event") == "property-change":
+            o = self.observers.get(data.get("id"))
+            if o:
+                try: o[1](data)
+                except Exception: pass
+            return
+        if "event" in data:
+            for cb in list(self.event_handlers.get(data["event"], ())) + list(self.event_handlers.get("*", ())):
+                try: cb(data)
+                except Exception: pass
+            return
+        with self.lock: fut = self.pending.pop(data.get("request_id"), None)
+        if fut and not fut.done():
+            if fut.t0: STATS.record("ipc", fut.name, fut.t0, status="ok" if data.get("error") == "success" else "error")
+            fut.set_result(data)
+    def _drop(self, s):
+        with self.lock:
+            if self.sock is not s: return
+            self.sock, pending, self.pending = None, self.pending, {}
+        try: s.close()
+        except OSError: pass
+        for fut in pending.values():
+            if not fut.done():
+                if fut.t0: STATS.record("ipc", fut.name, fut.t0, status="error")
+                fut.set_result(None)
+    def close(self):
+        s = self.sock
+        if s: self._drop(s)
+    def on_event(self, name, cb): self.event_handlers.setdefault(name, []).append(cb)
+    def off_event(self, name, cb):
+        try: self.event_handlers.get(name, []).remove(cb)
+        except ValueError: pass
+    def observe(self, name, cb):
+        oid = next(self.obs_ids); self.observers[oid] = (name, cb)
+        if self.sock: self.request({"command": ["observe_property", oid, name]})
+        else: self.connect()
+        return oid
+    def unobserve(self, oid):
+        if self.observers.pop(oid, None) and self.sock: self.request({"command": ["unobserve_property", oid]})
+    def pipeline(self, cmds):
+        futs, lines, t0 = [], [], STATS.enabled and time.perf_counter()
+        for cmd in cmds:
+            fut = Future(); fut.rid, fut.t0 = next(self.ids), t0; futs.append(fut)
+            if t0: fut.name = command_name(cmd)
+            lines.append(json.dumps(dict(cmd, request_id=fut.rid)))
+        if not lines: return futs
+        payload = ("\n".join(lines) + "\n").encode()
+        for attempt in (0, 1):
+            try:
+                s = self._connect()
+                with self.lock: self.pending.update((f.rid, f) for f in futs)
+                with self.send_lock: s.sendall(payload)
+                return futs
+            except OSError:
+                with self.lock:
+                    for f in futs: self.pending.pop(f.rid, None)
+                    s = self.sock
+                if s: self._drop(s)
+        for f in futs:
+            if t0: STATS.record("ipc", f.name, t0, status="error")
+            f.set_result(None)
+        return futs
+    def request(self, cmd): return self.pipeline([cmd])[0]
+    def command(self, cmd, timeout=None):
+        return self.wait(self.request(cmd), timeout)
+    def command_many(self, cmds, timeout=None):
+        futs = self.pipeline(cmds)
+        return [self.wait(f, timeout) for f in futs]
+    def wait(self, fut, timeout=None):
+        try: return fut.result(self.timeout if timeout is None else timeout)
+        except Exception:
+            with self.lock: fut = self.pending.pop(fut.rid, None) or fut
+            if fut.t0 and not fut.done(): STATS.record("ipc", fut.name, fut.t0, status="timeout")
+            return None
+    def get(self, name, default=None, timeout=None):
+        res = self.command({"command": ["get_property", name]}, timeout)
+        return res["data"] if res and res.get("error") == "success" and "data" in res else default
+_clients, _clients_lock = {}, threading.Lock()
+def get_client(path, timeout=0.5):
+    with _clients_lock:
+        c = _clients.get(path)
+        if c is None: c = _clients[path] = MPVClient(path, timeout)
+        return c
+def forget_client(path):
+    with _clients_lock: c = _clients.pop(path, None)
+    if c: c.close()
+def probe(path, cmd, timeout=0.3):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as c:
+            c.settimeout(timeout); c.connect(path); c.sendall(json.dumps(dict(cmd, request_id=1)).encode() + b"\n")
+            buf = bytearray()
+            while True:
+                chunk = c.recv(65536)
+                if not chunk: return None
+                scan = len(buf); buf += chunk
+                while True:
+                    nl = buf.find(b"\n", scan)
+                    if nl < 0: break
+                    try: data = json.loads(bytes(buf[:nl]))
+                    except ValueError: data = None
+                    del buf[:nl + 1]; scan = 0
+                    if isinstance(data, dict) and data.get("request_id") == 1: return data
+    except OSError: return None
@@ -0,0 +1,63 @@
+import os, time, json, threading, bisect, re
+from collections import deque
+BOUNDS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+INDEX_RE = re.compile(r'/\d+(?=/|$)')
+class _Null:
+    def __enter__(self): return self
+    def __exit__(self, *a): return False
+_NULL = _Null()
+class _Span:
+    __slots__ = ("stats", "cat", "name", "t0")
+    def __init__(self, stats, cat, name): self.stats, self.cat, self.name = stats, cat, name
+    def __enter__(self): self.t0 = time.perf_counter(); return self
+    def __exit__(self, et, ev, tb): self.stats.record(self.cat, self.name, self.t0, status="ok" if et is None else "error"); return False
+class Stats:
+    def __init__(self, enabled=False, max_trace=50000):
+        self.enabled, self.lock, self.t0, self.pid = enabled, threading.Lock(), time.perf_counter(), os.getpid()
+        self.hists, self.trace = {}, deque(maxlen=max_trace)
+    def now(self): return time.perf_counter()
+    def span(self, cat, name): return _Span(self, cat, name) if self.enabled else _NULL
+    def record(self, cat, name, t0, t1=None, status="ok"):
+        if not self.enabled: return
+        if t1 is None: t1 = time.perf_counter()
+        d = t1 - t0; key = (cat, name)
+        with self.lock:
+            h = self.hists.get(key)
+            if h is None: h = self.hists[key] = {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0, "errors": 0, "buckets": [0] * (len(BOUNDS) + 1)}
+            if status == "timeout": h["timeouts"] += 1
+            else:
+                h["count"] += 1; h["total"] += d; h["max"] = max(h["max"], d); h["buckets"][bisect.bisect_left(BOUNDS, d)] += 1
+                if status == "error": h["errors"] += 1
+            self.trace.append((cat, name, t0, d, threading.get_ident(), status))
+    def reset(self):
+        with self.lock: self.hists.clear(); self.trace.clear()
+    @staticmethod
+    def _pct(h, q):
+        n, acc = h["count"], 0
+        for i, c in enumerate(h["buckets"]):
+            acc += c
+            if n and acc >= q * n: return BOUNDS[i] if i < len(BOUNDS) else h["max"]
+        return 0.0
+    def snapshot(self):
+        with self.lock: items = [(k, dict(h, buckets=list(h["buckets"]))) for k, h in self.hists.items()]
+        out = []
+        for (cat, name), h in sorted(items):
+            n = h["count"]
+            out.append(dict(h, cat=cat, name=name, mean=h["total"] / n if n else 0.0, p50=self._pct(h, 0.5), p95=self._pct(h, 0.95), p99=self._pct(h, 0.99)))
+        return {"bounds": list(BOUNDS), "stats": out}
+    def summary(self):
+        lines = [f"{'category':<8} {'name':<34} {'n':>7} {'mean ms':>9} {'p95 ms':>8} {'max ms':>9} {'tmo':>5} {'err':>5}"]
+        for s in self.snapshot()["stats"]:
+            lines.append(f"{s['cat']:<8} {s['name'][:34]:<34} {s['count']:>7} {s['mean'] * 1000:9.2f} {s['p95'] * 1000:8.1f} {s['max'] * 1000:9.2f} {s['timeouts']:>5} {s['errors']:>5}")
+        return "\n".join(lines) if len(lines) > 1 else "No samples recorded."
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as f: json.dump(self.snapshot(), f, indent=1)
+    def export_trace(self, path):
+        with self.lock: trace = list(self.trace)
+        ev = [{"name": name, "cat": cat, "ph": "X", "ts": round((t0 - self.t0) * 1e6, 1), "dur": round(d * 1e6, 1), "pid": self.pid, "tid": tid, "args": {"status": st}} for cat, name, t0, d, tid, st in trace]
+        with open(path, "w", encoding="utf-8") as f: json.dump({"traceEvents": ev, "displayTimeUnit": "ms"}, f)
+def command_name(cmd):
+    c = cmd.get("command") or ["?"]
+    if c[0] in ("get_property", "set_property") and len(c) > 1: return f"{c[0]} {INDEX_RE.sub('/N', str(c[1]))}"
+    return str(c[0])
+STATS = Stats(os.environ.get("MPV_PM_STATS", "") not in ("", "0"))
@@ -0,0 +1,70 @@
+import os, threading
+import mpv_ipc
+from playlist_sync import PlaylistSync
+PROPS = ("path", "pause", "media-title", "volume", "playlist-pos", "playlist-count")
+QUIET = ("time-pos", "duration")
+class Player:
+    def __init__(self, path, label="", timeout=0.5):
+        self.path, self.label, self.client = path, label, mpv_ipc.get_client(path, timeout)
+        self.sync, self.state, self.oids, self.qids, self.handlers, self.view, self.fetched, self.seeded = PlaylistSync(self.client), {}, [], [], [], None, None, False
+        self.primed = set()
+    @property
+    def connected(self): return self.client.sock is not None
+    def describe(self):
+        st = self.state; title = st.get("media-title") or self.label or os.path.basename(self.path)
+        icon = "⏸" if st.get("pause") else "▶" if st.get("path") else "■"
+        vol = st.get("volume")
+        return f"{icon} {title}" + (f" · {int(vol)}%" if vol is not None else "")
+class PlayerRegistry:
+    def __init__(self, on_prop=None, on_event=None, events=("file-loaded",), timeout=0.5, seed=None, on_state=None):
+        self.on_prop, self.on_event, self.events, self.timeout, self.seed, self.on_state = on_prop, on_event, events, timeout, seed, on_state
+        self.players, self.lock = {}, threading.Lock()
+    def player(self, path, label=""):
+        with self.lock:
+            p, new = self.players.get(path), False
+            if p is None: p, new = Player(path, label, self.timeout), True; self.players[path] = p
+            elif label: p.label = label
+        if new: self._attach(p)
+        return p
+    def _attach(self, p):
+        for e in self.events:
+            h = lambda ev, p=p: self.on_event and self.on_event(p, ev)
+            p.client.on_event(e, h); p.handlers.append((e, h))
+        p.oids = [p.client.observe(n, lambda ev, p=p: self._prop(p, ev)) for n in PROPS]
+    def focus(self, path):
+        p = self.player(path)
+        for o in self.all():
+            if o is not p and o.qids:
+                for oid in o.qids: o.client.unobserve(oid)
+                o.qids = []
+        if not p.qids: p.qids = [p.client.observe(n, lambda ev, p=p: self._prop(p, ev)) for n in QUIET]
+        return p
+    def _prop(self, p, ev):
+        name, val, oid = ev.get("name"), ev.get("data"), ev.get("id")
+        p.state[name] = val
+        if oid not in p.primed: p.primed.add(oid)
+        elif self.on_state: self.on_state(p, name, val)
+        if self.on_prop and name not in QUIET: self.on_prop(p, name, val)
+    def update(self, sockets, keep=()):
+        paths, fresh = {s for s, _ in sockets} | set(keep), []
+        for s, label in sockets:
+            p = self.player(s, label)
+            if not p.connected: p.client.connect()
+            if self.seed and p.view is None and not p.seeded and p.connected and s not in keep: p.seeded = True; fresh.append(p)
+        with self.lock: gone = [s for s in self.players if s not in paths]
+        for s in gone: self.drop(s)
+        for p in fresh: self.seed(p)
+    def drop(self, path):
+        with self.lock: p = self.players.pop(path, None)
+        if p is None: return
+        for oid in p.oids + p.qids: p.client.unobserve(oid)
+        for e, h in p.handlers: p.client.off_event(e, h)
+        mpv_ipc.forget_client(path)
+    def all(self):
+        with self.lock: return list(self.players.values())
+    def broadcast(self, cmd, timeout=1.0):
+        futs = [(p, p.client.request(cmd)) for p in self.all() if p.connected]
+        return {p.path: p.client.wait(f, timeout) for p, f in futs}
+    def pause_all(self, on=True): return self.broadcast({"command": ["set_property", "pause", on]})
+    def volume_all(self, vol): return self.broadcast({"command": ["set_property", "volume", vol]})
+    def overview(self): return sorted((p.path, p.describe()) for p in self.all())
@@ -1,17 +1,59 @@
-import sys, socket, json, os, subprocess, re, gi, threading, glob
-from pathlib import Path
+import time
+STARTED = time.perf_counter()
+import sys, os, subprocess, gi, threading
+import mpv_ipc
+from playlist_reorder import plan_moves, apply_moves
+from mpv_discovery import SocketDiscovery
+from playlist_search import SearchIndex
+from config_store import ConfigStore
+from playlist_store import EntryStore, sort_entries, Entry, GroupIndex, group_id, FAVORITES, RECENT, MOST_PLAYED
+from library_db import LibraryDB
+from playlist_sync import fetch_playlist
+from player_registry import PlayerRegistry
+from zap import ZapTracker, Prewarmer, EVENTS as ZAP_EVENTS
+import view_snapshot
+from update_scheduler import UpdateScheduler
+from stream_health import HealthStore, HealthProber
+import m3u
+import epg
+from perf_stats import STATS
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, GObject, GLib, Gdk
+from gi.repository import Gtk, GObject, GLib, Gdk, GdkPixbuf
 os.environ["QT_ACCESSIBILITY"] = "0"
+def decode_logo(data, size):
+    loader = GdkPixbuf.PixbufLoader()
+    def fit(ld, w, h):
+        k = min(size / max(w, 1), size / max(h, 1), 1.0)
+        ld.set_size(max(1, int(w * k)), max(1, int(h * k)))
+    loader.connect("size-prepared", fit)
+    try: loader.write(data); loader.close()
+    except GLib.Error: return None
+    return loader.get_pixbuf()
 class MPVGTKManager(Gtk.Window):
     def __init__(self):
         super().__init__()
         self.socket_path = "/dev/shm/mpvsocket"
+        self.ipc = mpv_ipc.get_client(self.socket_path, 0.2)
         self.config_file = os.path.expanduser("~/.mpv_gtk_config.json")
-        self.favorites, self.m3u_groups, self.full_list_data = set(), {}, []
-        self.file_lock, self.update_lock, self.favorites_lock = threading.Lock(), threading.Lock(), threading.Lock()
-        self.sort_mode, self.current_playing_path, self.current_group, self.is_updating, self.resume_done, self.last_file_path, self.is_paused = 0, "", "All", False, False, "", False
-        self.last_playlist_path = ""
+        self.config = ConfigStore(self.config_file)
+        self.library = LibraryDB()
+        self.favorites, self.m3u_groups, self.full_list_data = self.library.favs, {}, []
+        self.group_index = GroupIndex()
+        self.m3u_entries, self.url_to_logo, self.logo_timer, self.logo_redraw = [], {}, 0, False
+        self.logos, self.snapshot_path = None, view_snapshot.default_path("gtk", self.socket_path)
+        self.favorites_lock = threading.Lock()
+        self.sort_mode, self.current_playing_path, self.current_group, self.resume_done, self.last_file_path, self.is_paused = 0, "", "All", False, "", False
+        self.updates = UpdateScheduler(self._update_thread, self._sync_thread)
+        self.last_playlist_path, self.update_t0, self.remote_refresh, self.remote_pending = "", 0.0, 360, False
+        self.sources, self.merge_stats = [], {}
+        self.search_base = SearchIndex()
+        self.search_index, self.search_hits, self.filter_favs, self.filter_virtual, self.search_timeout = self.search_base.attach([]), None, set(), None, 0
+        self.media_title, self.pos_by_file = None, None
+        self.volume, self.playlist_pos, self.playlist_count = None, -1, None
+        self.guide, self.epg_path, self.tvg_ids, self.epg_ticks = None, "", {}, 0
+        self.zap, self.prewarmer, self.prewarm = ZapTracker(), Prewarmer(), False
+        self.health = HealthStore()
+        self.prober, self.dead_urls, self.hide_dead = HealthProber(self.health), self.health.dead(), False
         self.apply_css()
         self.ensure_mpv_running()
         self.set_default_size(200, 750)
@@ -21,7 +63,7 @@ class MPVGTKManager(Gtk.Window):
         hb.get_style_context().add_class("compact-header")
         self.set_titlebar(hb)
         self.search_entry = Gtk.SearchEntry(placeholder_text="Search...", hexpand=True, width_chars=1)
-        self.search_entry.connect("changed", lambda w: self.filter.refilter())
+        self.search_entry.connect("changed", self.on_search_changed)
         hb.set_custom_title(self.search_entry)
         self.menu_button, self.group_button = Gtk.MenuButton(label="≡"), Gtk.MenuButton(label="▾")
         self.main_menu, self.group_menu = Gtk.Menu(), Gtk.Menu()
@@ -29,6 +71,7 @@ class MPVGTKManager(Gtk.Window):
         self.socket_root_item = Gtk.MenuItem(label="Select Player")
         self.socket_root_item.set_submenu(self.socket_submenu)
         self.rebuild_main_menu()
+        self.main_menu.connect("show", lambda m: self.rebuild_socket_menu())
         self.menu_button.set_popup(self.main_menu)
         self.group_button.set_popup(self.group_menu)
         hb.pack_end(self.menu_button)
@@ -37,15 +80,23 @@ class MPVGTKManager(Gtk.Window):
         self.add(self.overlay)
         self.scrolled = Gtk.ScrolledWindow()
         self.overlay.add(self.scrolled)
-        self.list_store = Gtk.ListStore(str, int, int, str, str, str, str)
+        self.list_store = Gtk.ListStore(int)
         self.filter = self.list_store.filter_new()
         self.filter.set_visible_func(self.filter_func)
         self.tree_view = Gtk.TreeView(model=self.filter, headers_visible=False)
         self.tree_view.connect("button-release-event", self.on_click)
         self.tree_view.connect("key-release-event", self.on_key_release)
-        r_txt = Gtk.CellRendererText(xpad=8, ypad=6, ellipsize=3)
-        self.tree_view.append_column(Gtk.TreeViewColumn("Name", r_txt, text=0, weight=2, foreground=4, background=5))
+        r_img, r_txt = Gtk.CellRendererPixbuf(xpad=4), Gtk.CellRendererText(xpad=8, ypad=6, ellipsize=3)
+        col = Gtk.TreeViewColumn("Name")
+        col.pack_start(r_img, False)
+        col.pack_start(r_txt, True)
+        col.set_cell_data_func(r_img, self.render_logo)
+        col.set_cell_data_func(r_txt, self.render_row)
+        self.tree_view.append_column(col)
         self.scrolled.add(self.tree_view)
+        vadj = self.scrolled.get_vadjustment()
+        vadj.connect("value-changed", self.schedule_logos)
+        vadj.connect("changed", self.schedule_logos)
         self.fab_container = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6, halign=Gtk.Align.END, valign=Gtk.Align.END, margin_bottom=25, margin_right=25)
         self.revealer = Gtk.Revealer(transition_type=Gtk.RevealerTransitionType.SLIDE_UP)
         sub_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
@@ -72,10 +123,18 @@ class MPVGTKManager(Gtk.Window):
         self.connect("drag-data-received", self.on_drag_data_received)
         self.connect("delete-event", self.on_delete_event)
         self.connect("configure-event", self.on_configure_event)
+        self.first_draw = self.tree_view.connect("draw", self.on_first_draw)
+        self.restore_snapshot()
         self.show_all()
         GLib.idle_add(self.auto_load_last_m3u)
-        GLib.timeout_add(1000, self.update_now_playing)
-        GLib.timeout_add(5000, self.refresh_sockets)
+        GLib.timeout_add_seconds(max(1, self.remote_refresh) * 60, self.refresh_remote)
+        if self.epg_path and os.path.exists(self.epg_path): self.load_epg(self.epg_path)
+        self.resume_at, self.resume_every = {}, 5.0
+        self.players = PlayerRegistry(lambda p, n, v: GLib.idle_add(self.on_property_changed, p.path, n, v), self._on_player_event, ("file-loaded", "shutdown") + ZAP_EVENTS, timeout=0.2, seed=self._seed_player, on_state=self._on_player_state)
+        self.player = self.players.focus(self.socket_path); self.sync = self.player.sync
+        if self.prewarm: self.apply_prefetch()
+        self.available_sockets = []
+        self.discovery = SocketDiscovery(lambda socks: GLib.idle_add(self.on_sockets_changed, socks)).start()
     def apply_css(self):
         css = b".compact-header { min-height: 24px; padding: 0; } .compact-header button { padding: 1px 2px; min-height: 20px; min-width: 20px; } .compact-header entry { min-height: 20px; margin: 2px 0; } .fab-button { border-radius: 50%; border: none; padding: 0; transition: all 150ms ease; box-shadow: none; } .fab-trigger { min-width: 32px; min-height: 32px; background: rgba(53, 132, 228, 0.7); color: white; } .fab-trigger:hover { background: rgba(53, 132, 228, 0.9); } .fab-small { min-width: 28px; min-height: 28px; background: rgba(60, 60, 60, 0.6); color: white; } .fab-small:hover { background: rgba(80, 80, 80, 0.8); } .fab-vol-slider { background: rgba(60, 60, 60, 0.6); border-radius: 14px; padding: 12px 0; } scale.fab-vol-slider contents trough { background: rgba(255, 255, 255, 0.2); min-width: 4px; border-radius: 2px; margin: 0 12px; } scale.fab-vol-slider contents trough highlight { background: #3584e4; border-radius: 2px; } scale.fab-vol-slider contents trough slider { background: #3584e4; min-width: 12px; min-height: 12px; border-radius: 50%; margin: -4px; border: none; box-shadow: none; } treeview { background-color: transparent; } treeview selection { border-radius: 8px; } treeview:selected { border-radius: 8px; background-color: #3584e4; color: white; }"
         p = Gtk.CssProvider()
@@ -85,116 +144,231 @@ class MPVGTKManager(Gtk.Window):
         if not os.path.exists(self.socket_path): subprocess.Popen(["mpv", "--idle", f"--input-ipc-server={self.socket_path}"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     def rebuild_main_menu(self):
         for c in self.main_menu.get_children(): self.main_menu.remove(c)
-        for l, cb in [("Open Playlist", self.on_load_clicked), ("Toggle Sorting", self.toggle_sort), ("Refresh", lambda x: self.update_playlist()), ("Clear Playlist", self.on_clear_clicked)]:
+        for l, cb in [("Open Playlist", self.on_load_clicked), ("Open URL…", self.on_open_url_clicked)] + ([("Apply Playlist Update", self.apply_remote_update)] if self.remote_pending else []) + [("Load EPG…", self.on_load_epg_clicked), ("Toggle Sorting", self.toggle_sort), ("Refresh", lambda x: self.update_playlist()), ("Stop Checking" if self.prober.running else "Check Streams", self.check_streams), ("Clear Playlist", self.on_clear_clicked)]:
             mi = Gtk.MenuItem(label=l)
             mi.connect("activate", cb)
             self.main_menu.append(mi)
+        self.main_menu.append(self.build_sources_menu())
+        hd = Gtk.CheckMenuItem(label="Hide Dead Streams", active=self.hide_dead)
+        hd.connect("toggled", self.toggle_hide_dead)
+        self.main_menu.append(hd)
+        pw = Gtk.CheckMenuItem(label="Pre-warm Neighbours", active=self.prewarm)
+        pw.connect("toggled", self.toggle_prewarm)
+        self.main_menu.append(pw)
+        zt = Gtk.MenuItem(label="Zap Times…")
+        zt.connect("activate", self.show_zap)
+        self.main_menu.append(zt)
         self.main_menu.append(Gtk.SeparatorMenuItem())
         self.main_menu.append(self.socket_root_item)
+        if STATS.enabled:
+            mi = Gtk.MenuItem(label="Stats…")
+            mi.connect("activate", self.show_stats)
+            self.main_menu.append(Gtk.SeparatorMenuItem()); self.main_menu.append(mi)
         self.main_menu.show_all()
-    def refresh_sockets(self):
+    def build_sources_menu(self):
+        root, menu = Gtk.MenuItem(label=f"Sources ({len(self.sources)})" if self.sources else "Merge Playlists"), Gtk.Menu()
+        for l, cb in (("Add Playlist…", self.on_add_source_clicked), ("Add URL…", lambda x: self.on_open_url_clicked(x, True))):
+            mi = Gtk.MenuItem(label=l)
+            mi.connect("activate", cb)
+            menu.append(mi)
+        if self.sources: menu.append(Gtk.SeparatorMenuItem())
+        for k, src in enumerate(self.sources):
+            st = self.merge_stats.get(src)
+            item, sub = Gtk.MenuItem(label=f"{k + 1}. {os.path.basename(src.rstrip('/')) or src}" + (f"  ({st.kept}/{st.total})" if st else "")), Gtk.Menu()
+            for l, cb, ok in (("Move Up", lambda x, k=k: self.move_source(k, -1), k > 0), ("Move Down", lambda x, k=k: self.move_source(k, 1), k < len(self.sources) - 1), ("Remove", lambda x, k=k: self.remove_source(k), True)):
+                if not ok: continue
+                mi = Gtk.MenuItem(label=l)
+                mi.connect("activate", cb)
+                sub.append(mi)
+            item.set_submenu(sub)
+            menu.append(item)
+        root.set_submenu(menu)
+        return root
+    def on_sockets_changed(self, sockets):
+        self.available_sockets = sockets
+        threading.Thread(target=self.players.update, args=(sockets, (self.socket_path,)), daemon=True).start()
+        self.rebuild_socket_menu()
+        return False
+    def rebuild_socket_menu(self):
         for c in self.socket_submenu.get_children(): self.socket_submenu.remove(c)
-        sockets = sorted(glob.glob("/dev/shm/mpvsocket*") + glob.glob("/tmp/mpvsocket*"))
-        for s in sockets:
-            old_path = self.socket_path
-            self.socket_path = s
-            title_res = self.send_command({"command": ["get_property", "media-title"]})
-            self.socket_path = old_path
-            label = title_res.get("data") if (title_res and title_res.get("data")) else os.path.basename(s)
+        for s, label in self.available_sockets:
+            pl = self.players.players.get(s)
+            if pl and pl.state: label = f"{label}  {pl.describe()}"
             mi = Gtk.MenuItem(label=f"✔ {label}" if s == self.socket_path else label)
             mi.connect("activate", self.switch_socket, s)
             self.socket_submenu.append(mi)
+        if len(self.players.players) > 1:
+            self.socket_submenu.append(Gtk.SeparatorMenuItem())
+            for l, on in (("Pause All", True), ("Resume All", False)):
+                mi = Gtk.MenuItem(label=l)
+                mi.connect("activate", lambda x, on=on: self.pause_all(on))
+                self.socket_submenu.append(mi)
+            vol_root, vol_menu = Gtk.MenuItem(label="Volume All"), Gtk.Menu()
+            for v in (25, 50, 75, 100):
+                mi = Gtk.MenuItem(label=f"{v}%")
+                mi.connect("activate", lambda x, v=v: self.volume_all(v))
+                vol_menu.append(mi)
+            vol_root.set_submenu(vol_menu)
+            self.socket_submenu.append(vol_root)
         self.socket_submenu.show_all()
-        return True
     def switch_socket(self, mi, path):
-        self.socket_path = path
-        self.update_playlist()
+        if path == self.socket_path: return
+        self.updates.cancel()
+        self.player = p = self.players.focus(path)
+        self.socket_path, self.ipc, self.sync = path, p.client, p.sync
+        if self.prewarm: self.apply_prefetch()
+        st = p.state
+        self.media_title, self.volume, self.playlist_pos = st.get("media-title"), st.get("volume"), st.get("playlist-pos", -1)
+        self.set_title(str(self.media_title) if self.media_title is not None else "MPV")
+        self.rebuild_socket_menu()
+        if p.view is None:
+            self.full_list_data, self.playlist_count, self.pos_by_file = [], None, None
+            self.list_store.clear()
+            self.update_playlist()
+            return
+        self.full_list_data, self.group_index, self.search_index, self.playlist_count = p.view
+        self.current_playing_path, self.is_paused = st.get("path") or "", bool(st.get("pause"))
+        self.populate_view()
+        count = st.get("playlist-count")
+        if count is not None and count != self.playlist_count: self.updates.request(full=False)
+    def _seed_player(self, p):
+        res = fetch_playlist(p.client)
+        if res is None: return
+        fl = [Entry(nm, fn, k, group_id(self.m3u_groups.get(nm, "Uncategorized"))) for k, (fn, nm) in enumerate((fn, t or os.path.basename(fn)) for fn, t in res)]
+        with self.favorites_lock: fav_copy = set(self.favorites)
+        view = (fl, GroupIndex(fl, fav_copy, self.virtual_groups()), self.search_base.attach(fl, key=epg.search_key(self.guide, self.tvg_ids)), len(fl))
+        if p.view is not None or p.path == self.socket_path: return
+        p.sync.reset([x.filename for x in fl], [x.name for x in fl])
+        p.view = view
+    def pause_all(self, on):
+        threading.Thread(target=self.players.pause_all, args=(on,), daemon=True).start()
+    def volume_all(self, vol):
+        threading.Thread(target=self.players.volume_all, args=(vol,), daemon=True).start()
     def send_command(self, cmd):
-        try:
-            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as c:
-                c.settimeout(0.2)
-                c.connect(self.socket_path)
-                c.sendall(json.dumps(cmd).encode() + b"\n")
-                res = b""
-                while True:
-                    chunk = c.recv(8192)
-                    if not chunk: break
-                    res += chunk
-                    if b"\n" in res: break
-                if res:
-                    for line in res.decode(errors="ignore").splitlines():
-                        if not line.strip(): continue
-                        try:
-                            data = json.loads(line)
-                            if any(k in data for k in ["request_id", "error", "data"]): return data
-                        except: continue
-        except: pass
-        return None
+        return self.ipc.command(cmd)
     def update_playlist(self):
-        with self.update_lock:
-            if self.is_updating: return
-            self.is_updating = True
-        threading.Thread(target=self._update_thread, daemon=True).start()
-    def _update_thread(self):
-        res = self.send_command({"command": ["get_property", "playlist"]})
-        path_res = self.send_command({"command": ["get_property", "path"]})
-        pause_res = self.send_command({"command": ["get_property", "pause"]})
+        if not self.updates.busy: self.update_t0 = STATS.now()
+        self.updates.request()
+    def _update_thread(self, gen):
+        player = self.player; ipc, sync = player.client, player.sync
+        with STATS.span("update", "fetch"):
+            res, player.fetched = player.fetched, None
+            if res is None: res = fetch_playlist(ipc, on_page=None if sync.files else lambda a, part: GLib.idle_add(self._show_preview, part))
+            path_res, pause_res = ipc.command_many([{"command": ["get_property", "path"]}, {"command": ["get_property", "pause"]}], 0.2)
         curr_p = path_res.get("data", "") if path_res else ""
         paused = pause_res.get("data", False) if pause_res else False
-        if not res or "data" not in res:
-            GLib.idle_add(self._set_updating_false)
-            return
-        groups, items = set(), []
+        if res is None or not self.updates.current(gen): return
+        store = EntryStore()
         with self.favorites_lock: fav_copy = set(self.favorites)
-        for idx, i in enumerate(res["data"]):
-            fn = i.get("filename", "")
-            name = i.get("title") or os.path.basename(fn)
-            grp = self.m3u_groups.get(name, "Uncategorized")
-            groups.add(grp)
-            items.append({"name": name, "filename": fn, "orig_idx": idx, "group": grp})
-        def sort_p(x):
-            is_fav = x["name"] in fav_copy
-            in_group = (self.current_group == "All") or (self.current_group == "★ Favorites" and is_fav) or (x["group"] == self.current_group)
-            return (not in_group, not is_fav, x["name"].lower())
-        full_sorted = sorted(items, key=sort_p, reverse=(self.sort_mode == 1))
-        GLib.idle_add(self._finalize_update, groups, full_sorted, curr_p, paused)
-    def _set_updating_false(self):
-        with self.update_lock: self.is_updating = False
+        with STATS.span("update", "group mapping"):
+            for fn, t in res:
+                name = t or os.path.basename(fn)
+                store.add(name, fn, self.m3u_groups.get(name, "Uncategorized"))
+        virtual = self.virtual_groups()
+        vm = virtual.get(self.current_group)
+        with STATS.span("update", "sort"):
+            full_sorted = sort_entries(store.entries, fav_copy, self.current_group, self.sort_mode == 1, self.dead_urls, set(vm) if vm is not None else None)
+        with STATS.span("update", "reorder"):
+            moves = plan_moves([x.orig_idx for x in full_sorted])
+            if moves and not apply_moves(ipc, moves, progress=lambda d, t: GLib.idle_add(self.on_reorder_progress, d, t), cancelled=self.updates.stale(gen)): return
+        for t_idx, item in enumerate(full_sorted): item.orig_idx = t_idx
+        with STATS.span("update", "index"):
+            group_index, search_index = GroupIndex(full_sorted, fav_copy, virtual), self.search_base.attach(full_sorted, key=epg.search_key(self.guide, self.tvg_ids))
+        if not self.updates.current(gen): return
+        sync.reset([x.filename for x in full_sorted], [x.name for x in full_sorted])
+        player.view = (full_sorted, group_index, search_index, len(full_sorted))
+        GLib.idle_add(self._finalize_update, group_index, full_sorted, curr_p, paused, search_index, gen)
+    def _show_preview(self, part):
+        if self.full_list_data: return False
+        self.full_list_data = [Entry(nm, fn, p, group_id(self.m3u_groups.get(nm, "Uncategorized"))) for p, (fn, nm) in enumerate((fn, t or os.path.basename(fn)) for fn, t in part)]
+        self.list_store.clear(); self.pos_by_file = None
+        for pos in range(len(self.full_list_data)): self.list_store.append([pos])
+        self.filter.refilter()
         return False
-    def _finalize_update(self, groups, full_sorted, curr_p, paused):
-        self.list_store.clear()
-        self.full_list_data, active_iter, self.current_playing_path, self.is_paused = full_sorted, None, curr_p, paused
+    def on_reorder_progress(self, done, total):
+        self.set_title(f"Sorting {done * 100 // total}%" if done < total else (str(self.media_title) if self.media_title is not None else "MPV"))
+        return False
+    def _sync_thread(self, gen):
+        player = self.player
+        if player.view is None: GLib.idle_add(self._apply_sync, gen, player.path, None); return
+        ops = player.sync.sync()
+        if not ops: GLib.idle_add(self._apply_sync, gen, player.path, ops if ops is None else player.view); return
+        fl = list(player.view[0])
+        for op in ops:
+            if op[0] == "insert":
+                fl[op[1]:op[1]] = [Entry(nm, fn, 0, group_id(self.m3u_groups.get(nm, "Uncategorized"))) for fn, nm in ((fn, t or os.path.basename(fn)) for fn, t in op[2])]
+            else: del fl[op[1]:op[1] + op[2]]
+        for p, e in enumerate(fl): e.orig_idx = p
         with self.favorites_lock: fav_copy = set(self.favorites)
-        for i in full_sorted:
-            is_p, is_f = i["filename"] == curr_p, i["name"] in fav_copy
-            status_icon = "⏸ " if (is_p and paused) else ("▶ " if is_p else "")
-            dn = status_icon + (f"★ " if is_f else "") + i['name']
-            bg, fg, w = ("#3584e4", "#ffffff", 800) if is_p else (None, "#555555", 400)
-            it = self.list_store.append([dn, i["orig_idx"], w, i["group"], fg, bg, i["filename"]])
-            if is_p: active_iter = it
-        self.rebuild_group_menu(groups)
+        player.view = (fl, GroupIndex(fl, fav_copy, self.virtual_groups()), self.search_base.attach(fl, key=epg.search_key(self.guide, self.tvg_ids)), len(fl))
+        GLib.idle_add(self._apply_sync, gen, player.path, player.view, ops)
+    def _apply_sync(self, gen, path, view, ops=None):
+        if not self.updates.current(gen) or path != self.socket_path: return False
+        if view is None: self.update_playlist(); return False
+        fl, group_index, search_index, self.playlist_count = view
+        if not ops: return False
+        old_n = len(self.full_list_data)
+        self.group_index = group_index
+        if len(ops) == 1 and ops[0][0] == "insert" and ops[0][1] == old_n:
+            self.full_list_data, self.search_index, self.pos_by_file = fl, search_index, None
+            self.prepare_filter()
+            for pos in range(old_n, len(fl)): self.list_store.append([pos])
+            self.rebuild_group_menu()
+        else:
+            self.full_list_data, self.search_index = fl, search_index
+            self.populate_view()
+        return False
+    def populate_view(self):
+        self.list_store.clear()
+        self.pos_by_file = None
+        self.prepare_filter()
+        for pos in range(len(self.full_list_data)): self.list_store.append([pos])
+        self.rebuild_group_menu()
         self.filter.refilter()
-        if active_iter:
-            try:
-                f_path = self.filter.convert_child_path_to_path(self.list_store.get_path(active_iter))
-                if f_path: self.tree_view.get_selection().select_path(f_path)
-            except: pass
+        self.select_pos(self.pos_of(self.current_playing_path))
+    def pos_of(self, filename):
+        if self.pos_by_file is None:
+            self.pos_by_file = {}
+            for p, i in enumerate(self.full_list_data): self.pos_by_file.setdefault(i.filename, p)
+        return self.pos_by_file.get(filename, -1)
+    def refresh_pos(self, pos):
+        if 0 <= pos < len(self.list_store):
+            path = Gtk.TreePath(pos)
+            self.list_store.row_changed(path, self.list_store.get_iter(path))
+    def select_pos(self, pos):
+        if pos < 0: return
+        try:
+            f_path = self.filter.convert_child_path_to_path(Gtk.TreePath(pos))
+            if f_path: self.tree_view.get_selection().select_path(f_path)
+        except: pass
+    def set_now_playing(self, path, paused):
+        old, moved = self.pos_of(self.current_playing_path), path != self.current_playing_path
+        self.current_playing_path, self.is_paused = path, paused
+        self.refresh_pos(old)
+        if moved:
+            new = self.pos_of(path)
+            self.refresh_pos(new)
+            self.select_pos(new)
+    def _finalize_update(self, group_index, full_sorted, curr_p, paused, search_index, gen):
+        if not self.updates.current(gen): return False
+        self.full_list_data, self.current_playing_path, self.is_paused = full_sorted, curr_p, paused
+        self.playlist_count = len(full_sorted)
+        self.search_index, self.group_index = search_index, group_index
+        with STATS.span("update", "view rebuild"): self.populate_view()
         if not self.resume_done and self.last_file_path:
             for i in full_sorted:
-                if i["filename"] == self.last_file_path:
-                    self.send_command({"command": ["set_property", "playlist-pos", i["orig_idx"]]})
+                if i.filename == self.last_file_path:
+                    self.send_command({"command": ["set_property", "playlist-pos", i.orig_idx]})
                     self.send_command({"command": ["set_property", "pause", True]})
                     self.resume_done = True
                     break
-        with self.update_lock: self.is_updating = False
+        STATS.record("update", "total", self.update_t0)
         return False
-    def rebuild_group_menu(self, groups):
+    def rebuild_group_menu(self):
         for c in self.group_menu.get_children(): self.group_menu.remove(c)
-        with self.favorites_lock: fav_copy = set(self.favorites)
-        counts = {"All": len(self.full_list_data), "★ Favorites": sum(1 for x in self.full_list_data if x["name"] in fav_copy)}
-        for g in groups: counts[g] = sum(1 for x in self.full_list_data if x["group"] == g)
-        for o in ["All", "★ Favorites"] + sorted(list(groups)):
-            lbl = f"{o} ({counts.get(o, 0)})"
+        gi = self.group_index
+        for o in ["All", FAVORITES, RECENT, MOST_PLAYED] + gi.groups():
+            lbl = f"{o} ({gi.count(o)})"
             item = Gtk.MenuItem(label=f"• {lbl}" if o == self.current_group else lbl)
             item.connect("activate", self.on_group_selected, o)
             self.group_menu.append(item)
@@ -203,21 +377,205 @@ class MPVGTKManager(Gtk.Window):
         self.current_group = name
         self.save_all_data()
         self.update_playlist()
-    def update_now_playing(self):
-        path_res = self.send_command({"command": ["get_property", "path"]})
-        pause_res = self.send_command({"command": ["get_property", "pause"]})
-        new_path = path_res.get("data", "") if path_res else ""
-        new_pause = pause_res.get("data", False) if pause_res else False
-        if new_path != self.current_playing_path or new_pause != self.is_paused: self.update_playlist()
-        res = self.send_command({"command": ["get_property", "media-title"]})
-        self.set_title(str(res.get('data')) if (res and "data" in res) else "MPV")
-        return True
+    def _on_player_event(self, p, ev):
+        if ev.get("event") in ("end-file", "shutdown"): self.save_resume(p)
+        if p.path != self.socket_path: return
+        if ev.get("event") == "file-loaded": self._on_file_loaded(ev)
+        elif self.zap.on_event(ev) and self.prewarm: self.warm_neighbours()
+    def toggle_prewarm(self, mi):
+        if mi.get_active() == self.prewarm: return
+        self.prewarm = mi.get_active()
+        self.save_all_data()
+        if self.prewarm:
+            self.apply_prefetch()
+            self.warm_neighbours()
+    def apply_prefetch(self):
+        ipc = self.ipc
+        threading.Thread(target=lambda: ipc.wait_connected() and self.prewarmer.prefetch(ipc), daemon=True).start()
+    def warm_neighbours(self):
+        fl, i = self.full_list_data, self.player.state.get("playlist-pos")
+        self.prewarmer.warm([fl[j].filename for j in ((i + 1, i - 1) if i is not None else ()) if 0 <= j < len(fl)] + self.library.recent(4))
+    def on_property_changed(self, path, name, val):
+        if path != self.socket_path: return False
+        if name == "path":
+            if (val or "") != self.current_playing_path:
+                if val:
+                    p = self.pos_of(val)
+                    self.library.played(val, self.full_list_data[p].name if p >= 0 else os.path.basename(val))
+                self.set_now_playing(val or "", self.is_paused)
+        elif name == "pause":
+            if bool(val) != self.is_paused: self.set_now_playing(self.current_playing_path, bool(val))
+        elif name == "media-title":
+            self.media_title = val
+            self.set_title(str(val) if val is not None else "MPV")
+        elif name == "volume":
+            self.volume = val
+            if val is not None and self.revealer.get_reveal_child():
+                with self.vol_scale.handler_block_by_func(self.on_vol_changed): self.vol_scale.set_value(val)
+        elif name == "playlist-pos":
+            self.playlist_pos = -1 if val is None else val
+            self.sync.set_current(val)
+        elif name == "playlist-count":
+            if self.playlist_count is not None and val != self.playlist_count: self.updates.request(full=False)
+        return False
+    def on_search_changed(self, w):
+        if self.search_timeout: GLib.source_remove(self.search_timeout)
+        self.search_timeout = GLib.timeout_add(120, self.run_search)
+    def run_search(self):
+        self.search_timeout = 0
+        with STATS.span("ui", "refilter"):
+            self.prepare_filter()
+            self.filter.refilter()
+        return False
+    def prepare_filter(self):
+        hits = self.search_index.search(self.search_entry.get_text(), fuzzy=True)
+        self.search_hits = None if hits is None else set(hits)
+        with self.favorites_lock: self.filter_favs = set(self.favorites)
+        vp = self.group_index.virtual.get(self.current_group)
+        self.filter_virtual = set(vp) if vp is not None else None
     def filter_func(self, model, iter, data):
-        dn = model.get_value(iter, 0)
-        name, grp, q = dn.replace("★ ", "").replace("▶ ", "").replace("⏸ ", "").strip(), model.get_value(iter, 3), self.search_entry.get_text().lower()
-        if self.current_group == "★ Favorites":
-            with self.favorites_lock: return name in self.favorites and q in name.lower()
-        return q in name.lower() if self.current_group == "All" else (grp == self.current_group and q in name.lower())
+        pos = model.get_value(iter, 0)
+        if pos >= len(self.full_list_data) or (self.search_hits is not None and pos not in self.search_hits): return False
+        if self.hide_dead and self.full_list_data[pos].filename in self.dead_urls: return False
+        if self.current_group == FAVORITES: return self.full_list_data[pos].name in self.filter_favs
+        if self.filter_virtual is not None: return pos in self.filter_virtual
+        return self.current_group == "All" or self.full_list_data[pos].group == self.current_group
+    def render_row(self, col, cell, model, iter, data):
+        pos = model.get_value(iter, 0)
+        if pos >= len(self.full_list_data): return
+        i = self.full_list_data[pos]
+        is_p = i.filename == self.current_playing_path
+        status_icon = ("⏸ " if self.is_paused else "▶ ") if is_p else ""
+        prog = self.epg_title(i)
+        cell.set_property("text", status_icon + ("★ " if i.name in self.filter_favs else "") + i.name + (f"  ·  {prog}" if prog else ""))
+        cell.set_property("weight", 800 if is_p else 400)
+        cell.set_property("foreground", "#ffffff" if is_p else "#aaaaaa" if i.filename in self.dead_urls else "#555555")
+        if is_p: cell.set_property("background", "#3584e4")
+        else: cell.set_property("background-set", False)
+    def on_first_draw(self, w, cr):
+        if not len(self.filter): return False
+        self.tree_view.disconnect(self.first_draw)
+        STATS.record("startup", "first painted row", STARTED)
+        if os.environ.get("MPV_PM_STARTUP_PROBE"):
+            print(f"first-paint {(time.perf_counter() - STARTED) * 1000:.1f} ms rows={len(self.filter)}", flush=True)
+            GLib.idle_add(Gtk.main_quit)
+        return False
+    def restore_snapshot(self):
+        snap = view_snapshot.load(self.snapshot_path)
+        if snap is None or snap.meta.get("playlist", "") != self.last_playlist_path or snap.meta.get("group") != self.current_group: return
+        self.full_list_data, self.current_playing_path, self.is_paused = snap.entries, snap.meta.get("current", ""), bool(snap.meta.get("paused"))
+        self.filter_favs, self.filter_virtual, self.pos_by_file = set(snap.favorites), {i.orig_idx for i in snap.shown}, None
+        for pos in range(len(snap.entries)): self.list_store.append([pos])
+        self.filter.refilter()
+        self.select_pos(self.pos_of(self.current_playing_path))
+        def index():
+            gi, si = GroupIndex(snap.entries, snap.favorites, self.virtual_groups()), self.search_base.attach(snap.entries)
+            GLib.idle_add(self._apply_restored, snap.entries, gi, si)
+        threading.Thread(target=index, daemon=True).start()
+    def _apply_restored(self, fl, gi, si):
+        if fl is not self.full_list_data: return False
+        self.group_index, self.search_index = gi, si
+        self.prepare_filter()
+        self.filter.refilter()
+        self.rebuild_group_menu()
+        return False
+    def save_snapshot(self):
+        if not self.full_list_data: return
+        gp = self.group_index.positions(self.current_group)
+        view_snapshot.save(self.snapshot_path, self.full_list_data, range(len(self.full_list_data)) if gp is None else gp, self.favorites, playlist=self.last_playlist_path, group=self.current_group, current=self.current_playing_path, paused=self.is_paused)
+    def render_logo(self, col, cell, model, iter, data):
+        pos = model.get_value(iter, 0)
+        if pos >= len(self.full_list_data): return
+        i = self.full_list_data[pos]
+        lg = self.url_to_logo.get(i.filename)
+        cell.set_property("pixbuf", self.logos.get(lg) if lg and self.logos else None)
+        if i.filename == self.current_playing_path: cell.set_property("cell-background", "#3584e4")
+        else: cell.set_property("cell-background-set", False)
+    def schedule_logos(self, *a):
+        if not self.logo_timer: self.logo_timer = GLib.timeout_add(40, self.request_logos)
+    def request_logos(self, margin=10):
+        self.logo_timer = 0
+        rng = self.tree_view.get_visible_range()
+        if not rng or not self.url_to_logo or self.logos is None: return False
+        f, n, lg = self.filter, self.filter.iter_n_children(None), self.url_to_logo
+        urls = []
+        for k in range(max(0, rng[0].get_indices()[0] - margin), min(n, rng[1].get_indices()[0] + margin + 1)):
+            pos = f.get_value(f.iter_nth_child(None, k), 0)
+            if pos < len(self.full_list_data): urls.append(lg.get(self.full_list_data[pos].filename))
+        self.logos.request(urls)
+        return False
+    def on_logo_ready(self, url):
+        if not self.logo_redraw: self.logo_redraw = True; GLib.idle_add(self._redraw_logos)
+    def _redraw_logos(self):
+        self.logo_redraw = False
+        self.tree_view.queue_draw()
+        return False
+    def check_streams(self, mi):
+        if self.prober.running: self.prober.cancel(); return
+        urls = self.health.stale([i.filename for i in self.full_list_data])
+        if not urls: self._health_done(); return
+        self.prober.check(urls, on_progress=lambda d, t: GLib.idle_add(self.on_health_progress, d, t), on_done=lambda: GLib.idle_add(self._health_done))
+        self.rebuild_main_menu()
+    def on_health_progress(self, done, total):
+        self.set_title(f"Checking {done * 100 // total}%" if done < total else (str(self.media_title) if self.media_title is not None else "MPV"))
+        return False
+    def _health_done(self):
+        self.dead_urls = self.health.dead()
+        self.rebuild_main_menu()
+        self.update_playlist()
+        return False
+    def toggle_hide_dead(self, mi):
+        if mi.get_active() == self.hide_dead: return
+        self.hide_dead = mi.get_active()
+        self.save_all_data()
+        self.run_search()
+    def epg_title(self, i):
+        return self.guide.title_now(epg.entry_key(self.tvg_ids, i)) if self.guide else ""
+    def on_load_epg_clicked(self, mi):
+        diag = Gtk.FileChooserDialog(title="Select XMLTV", parent=self, action=Gtk.FileChooserAction.OPEN)
+        diag.add_buttons("_Cancel", Gtk.ResponseType.CANCEL, "_Open", Gtk.ResponseType.OK)
+        if diag.run() == Gtk.ResponseType.OK: self.load_epg(diag.get_filename())
+        diag.destroy()
+    def load_epg(self, path):
+        epg.load_async(path, lambda p, g: GLib.idle_add(self._epg_loaded, p, g))
+    def _epg_loaded(self, path, guide):
+        if guide is None: return False
+        first = self.guide is None
+        self.guide, self.epg_path = guide, path
+        self.save_all_data()
+        if first: GLib.timeout_add_seconds(60, self.on_epg_tick)
+        self.update_playlist()
+        return False
+    def on_epg_tick(self):
+        self.tree_view.queue_draw()
+        self.epg_ticks += 1
+        if self.epg_ticks % 5 == 0: threading.Thread(target=self._reindex_thread, args=(self.full_list_data,), daemon=True).start()
+        return True
+    def _reindex_thread(self, fl):
+        si = self.search_base.attach(fl, key=epg.search_key(self.guide, self.tvg_ids))
+        GLib.idle_add(self._apply_reindex, fl, si)
+    def _apply_reindex(self, fl, si):
+        if fl is not self.full_list_data: return False
+        self.search_index = si
+        if self.search_entry.get_text().strip(): self.run_search()
+        return False
+    def virtual_groups(self):
+        return {RECENT: self.library.recent(), MOST_PLAYED: self.library.most_played()}
+    def _on_file_loaded(self, ev):
+        threading.Thread(target=self._resume_thread, daemon=True).start()
+    def _resume_thread(self):
+        path = self.ipc.get("path")
+        pos = self.library.resume(path) if path else None
+        if pos and (self.ipc.get("duration") or 0) > pos: self.ipc.command({"command": ["seek", pos, "absolute"]})
+    def save_resume(self, p=None):
+        for pl in [p] if p else self.players.all():
+            st = pl.state; path, dur = st.get("path"), st.get("duration")
+            if path and dur: self.library.set_resume(path, st.get("time-pos"), dur)
+    def _on_player_state(self, p, name, val):
+        if name == "pause" and val: self.save_resume(p)
+        elif name == "time-pos" and val is not None:
+            now = time.monotonic()
+            if now - self.resume_at.get(p.path, 0.0) >= self.resume_every: self.resume_at[p.path] = now; self.save_resume(p)
     def toggle_sort(self, mi):
         self.sort_mode = 1 - self.sort_mode
         self.update_playlist()
@@ -226,9 +584,68 @@ class MPVGTKManager(Gtk.Window):
         diag.add_buttons("_Cancel", Gtk.ResponseType.CANCEL, "_Open", Gtk.ResponseType.OK)
         if diag.run() == Gtk.ResponseType.OK: self.load_playlist_file(diag.get_filename())
         diag.destroy()
+    def on_add_source_clicked(self, mi):
+        diag = Gtk.FileChooserDialog(title="Add Playlists", parent=self, action=Gtk.FileChooserAction.OPEN, select_multiple=True)
+        diag.add_buttons("_Cancel", Gtk.ResponseType.CANCEL, "_Add", Gtk.ResponseType.OK)
+        paths = diag.get_filenames() if diag.run() == Gtk.ResponseType.OK else []
+        diag.destroy()
+        if paths: self.add_sources(paths)
+    def on_open_url_clicked(self, mi, add=False):
+        dlg = Gtk.Dialog(title="Add URL" if add else "Open URL", transient_for=self, modal=True)
+        dlg.add_buttons("_Cancel", Gtk.ResponseType.CANCEL, "_Open", Gtk.ResponseType.OK)
+        dlg.set_default_response(Gtk.ResponseType.OK)
+        e = Gtk.Entry(activates_default=True, width_chars=48, placeholder_text="https://…/playlist.m3u")
+        if not add and m3u.is_url(self.last_playlist_path): e.set_text(self.last_playlist_path)
+        dlg.get_content_area().pack_start(e, True, True, 6)
+        dlg.show_all()
+        url = e.get_text().strip() if dlg.run() == Gtk.ResponseType.OK else ""
+        dlg.destroy()
+        if m3u.is_url(url): self.add_sources([url]) if add else self.load_playlist_file(url)
+    def show_stats(self, mi):
+        dlg = Gtk.Dialog(title="Stats", transient_for=self, modal=True)
+        dlg.add_buttons("Refresh", 1, "Reset", 2, "Export JSON", 3, "Export Trace", 4, "_Close", Gtk.ResponseType.CLOSE)
+        dlg.set_default_size(760, 420)
+        buf = Gtk.TextBuffer()
+        tv = Gtk.TextView(buffer=buf, editable=False, monospace=True)
+        sw = Gtk.ScrolledWindow(vexpand=True)
+        sw.add(tv)
+        dlg.get_content_area().pack_start(sw, True, True, 0)
+        dlg.show_all()
+        while True:
+            buf.set_text(STATS.summary())
+            r = dlg.run()
+            if r == 2: STATS.reset()
+            elif r in (3, 4):
+                fc = Gtk.FileChooserDialog(title="Export", parent=dlg, action=Gtk.FileChooserAction.SAVE, do_overwrite_confirmation=True)
+                fc.add_buttons("_Cancel", Gtk.ResponseType.CANCEL, "_Save", Gtk.ResponseType.OK)
+                fc.set_current_name("mpv-pm-trace.json" if r == 4 else "mpv-pm-stats.json")
+                if fc.run() == Gtk.ResponseType.OK:
+                    try: STATS.export_trace(fc.get_filename()) if r == 4 else STATS.export_json(fc.get_filename())
+                    except OSError: pass
+                fc.destroy()
+            elif r != 1: break
+        dlg.destroy()
+    def show_zap(self, mi):
+        dlg = Gtk.Dialog(title="Zap Times", transient_for=self, modal=True)
+        dlg.add_buttons("Refresh", 1, "Reset", 2, "_Close", Gtk.ResponseType.CLOSE)
+        dlg.set_default_size(640, 360)
+        buf = Gtk.TextBuffer()
+        tv = Gtk.TextView(buffer=buf, editable=False, monospace=True)
+        sw = Gtk.ScrolledWindow(vexpand=True)
+        sw.add(tv)
+        dlg.get_content_area().pack_start(sw, True, True, 0)
+        dlg.show_all()
+        while True:
+            buf.set_text(self.zap.summary())
+            r = dlg.run()
+            if r == 2: self.zap.reset()
+            elif r != 1: break
+        dlg.destroy()
     def on_clear_clicked(self, mi):
         self.send_command({"command": ["playlist-clear"]})
-        self.m3u_groups = {}
+        self.sources, self.merge_stats = [], {}
+        self.m3u_groups, self.url_to_logo = {}, {}
+        self.m3u_entries = []
         self.update_playlist()
     def on_click(self, tree, event):
         pi = tree.get_path_at_pos(int(event.x), int(event.y))
@@ -237,12 +654,16 @@ class MPVGTKManager(Gtk.Window):
         elif event.button == 3:
             f_iter = self.filter.get_iter(pi[0])
             if f_iter:
-                n = self.filter.get_value(f_iter, 0).replace("★ ", "").replace("▶ ", "").replace("⏸ ", "").strip()
+                pos = self.filter.get_value(f_iter, 0)
+                i = self.full_list_data[pos]
                 with self.favorites_lock:
-                    if n in self.favorites: self.favorites.remove(n)
-                    else: self.favorites.add(n)
-                self.save_all_data()
-                self.update_playlist()
+                    on = self.library.toggle_favorite(i.name, i.filename)
+                    self.group_index.set_favorite(i.name, on)
+                if on: self.filter_favs.add(i.name)
+                else: self.filter_favs.discard(i.name)
+                self.rebuild_group_menu()
+                if self.current_group == FAVORITES: self.filter.refilter()
+                else: self.refresh_pos(pos)
     def on_key_release(self, tree, event):
         if event.keyval in (Gdk.KEY_Return, Gdk.KEY_KP_Enter, Gdk.KEY_space):
             model, it = tree.get_selection().get_selected()
@@ -250,62 +671,136 @@ class MPVGTKManager(Gtk.Window):
     def activate_row(self, path):
         f_iter = self.filter.get_iter(path)
         if f_iter:
-            self.send_command({"command": ["set_property", "playlist-pos", self.filter.get_value(f_iter, 1)]})
-            self.send_command({"command": ["set_property", "pause", False]})
-    def load_playlist_file(self, path):
+            i = self.full_list_data[self.filter.get_value(f_iter, 0)]
+            self.zap.begin(i.filename, i.group)
+            fut = self.ipc.pipeline([{"command": ["set_property", "playlist-pos", i.orig_idx]}, {"command": ["set_property", "pause", False]}])[0]
+            fut.add_done_callback(lambda f, url=i.filename: self.zap.ack(url, f.result()))
+    def load_playlist_file(self, path, attach=False):
+        if m3u.is_url(path):
+            import remote_m3u
+            remote_m3u.load_async(path, lambda u, local, e, changed: e is not None and self._playlist_parsed(u, e, attach, local)); return
         if not path or not os.path.exists(path): return
-        self.m3u_groups = {}
-        try:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    if line.strip().startswith("#EXTINF"):
-                        m, nm = re.search(r'group-title="([^"]+)"', line), re.search(r',(.+)$', line)
-                        if nm: self.m3u_groups[nm.group(1).strip()] = m.group(1) if m else "Uncategorized"
-        except: pass
-        self.send_command({"command": ["loadlist", path, "replace"]})
+        m3u.load_async(path, lambda p, e: self._playlist_parsed(p, e, attach))
+    def load_sources(self, attach=False):
+        self.save_all_data()
+        import playlist_merge
+        playlist_merge.load_async(self.sources, lambda p, e, st: e is not None and self._sources_merged(p, e, st, attach))
+    def _sources_merged(self, path, entries, stats, attach):
+        import playlist_merge
+        if path != playlist_merge.merged_path(self.sources): return
+        self.merge_stats = {s.source: s for s in stats}
+        self._playlist_parsed(path, entries, attach)
+    def add_sources(self, paths):
+        if not self.sources and self.last_playlist_path: self.sources = [self.last_playlist_path]
+        self.sources += [p for p in dict.fromkeys(paths) if p not in self.sources]
+        self.load_sources()
+    def move_source(self, k, d):
+        s = self.sources; s[k], s[k + d] = s[k + d], s[k]
+        self.load_sources()
+    def remove_source(self, k):
+        del self.sources[k]
+        if len(self.sources) > 1: return self.load_sources()
+        rest, self.sources = self.sources, []
+        if rest: self.load_playlist_file(rest[0])
+        else: self.save_all_data(); self.rebuild_main_menu()
+    def refresh_remote(self):
+        if any(map(m3u.is_url, self.sources)):
+            import playlist_merge
+            playlist_merge.load_async(self.sources, self._sources_checked)
+        elif m3u.is_url(self.last_playlist_path):
+            import remote_m3u
+            remote_m3u.load_async(self.last_playlist_path, self._remote_checked)
+        return True
+    def _sources_checked(self, path, entries, stats):
+        if entries is not None: self._remote_checked(path, path, entries, m3u.fingerprint(e.url for e in entries) != m3u.fingerprint(e.url for e in self.m3u_entries), stats)
+    def _remote_checked(self, url, local, entries, changed, stats=None):
+        if entries is None or url != self.last_playlist_path: return
+        if changed and not self.ipc.get("idle-active", False): self.remote_pending = True; GLib.idle_add(self.rebuild_main_menu); return
+        if stats is not None: self.merge_stats = {s.source: s for s in stats}; GLib.idle_add(self.rebuild_main_menu)
+        if changed: self._playlist_parsed(url, entries, False, local)
+    def apply_remote_update(self, mi):
+        self.remote_pending = False; self.rebuild_main_menu()
+        if self.sources: self.load_sources()
+        else: self.load_playlist_file(self.last_playlist_path)
+    def _playlist_parsed(self, path, entries, attach=False, local=None):
+        entries = entries or []
+        groups = {e.name: e.group for e in entries if e.name}
+        logos = {m3u.resolve(path, e.url): m3u.resolve(path, e.logo) for e in entries if e.logo}
+        self.ipc.wait_connected()
+        attached = attach and self.player_has_playlist(path, entries)
+        if not attached: self.ipc.command({"command": ["loadlist", local or path, "replace"]}, 30.0)
+        GLib.idle_add(self._finalize_load, path, entries, groups, logos, attached and bool(self.ipc.get("path")))
+    def player_has_playlist(self, path, entries):
+        if not entries or self.ipc.get("playlist-count", -1, 2.0) != len(entries): return False
+        pl = [(i.get("filename", ""), i.get("title") or "") for i in self.ipc.get("playlist", [], 10.0)]
+        if m3u.fingerprint(f for f, _ in pl) != m3u.fingerprint(m3u.resolve(path, e.url) for e in entries): return False
+        self.player.fetched = pl
+        return True
+    def _finalize_load(self, path, entries, groups, logos, playing):
+        self.m3u_entries, self.m3u_groups, self.url_to_logo = entries, groups, logos
+        if logos and self.logos is None:
+            from logo_cache import LogoCache
+            self.logos = LogoCache(decode_logo, self.on_logo_ready)
+        self.tvg_ids = epg.tvg_map(entries)
+        if playing: self.resume_done = True
+        self.search_base = SearchIndex()
+        if self.sources:
+            import playlist_merge
+            if path != playlist_merge.merged_path(self.sources): self.sources, self.merge_stats = [], {}
         self.last_playlist_path = path
         self.save_all_data()
-        GLib.timeout_add(500, self.update_playlist)
+        self.rebuild_main_menu()
+        self.update_playlist()
+        return False
     def load_all_data(self):
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, "r", encoding="utf-8") as f:
-                    c = json.load(f)
-                    self.move(c.get("x", 100), c.get("y", 100))
-                    self.resize(c.get("w", 200), c.get("h", 750))
-                    self.current_group, self.last_file_path = c.get("current_group", "All"), c.get("last_playing", "")
-                    self.favorites = set(c.get("favorites", []))
-                    self.last_playlist_path = c.get("last_playlist_path", "")
+            c = self.config.load()
+            self.move(c.get("x", 100), c.get("y", 100))
+            self.resize(c.get("w", 200), c.get("h", 750))
+            self.current_group, self.last_file_path = c.get("current_group", "All"), c.get("last_playing", "")
+            if c.get("favorites"):
+                self.library.import_favorites(c["favorites"])
+                self.config.set(favorites=[])
+            self.last_playlist_path = c.get("last_playlist_path", "")
+            self.hide_dead = bool(c.get("hide_dead", False))
+            self.epg_path = c.get("epg_path", "")
+            self.prewarm = bool(c.get("prewarm", False))
+            self.remote_refresh = int(c.get("remote_refresh_minutes", 360))
+            self.sources = [s for s in c.get("playlist_sources", []) if s]
+            STATS.enabled = STATS.enabled or bool(c.get("stats"))
         except: pass
     def save_all_data(self):
-        try:
-            path_res = self.send_command({"command": ["get_property", "path"]})
-            curr = path_res.get("data", "") if path_res else ""
-            pos, size = self.get_position(), self.get_size()
-            with self.file_lock:
-                with open(self.config_file, "w", encoding="utf-8") as f:
-                    json.dump({"x": pos[0], "y": pos[1], "w": size[0], "h": size[1], "current_group": self.current_group, "last_playing": curr, "favorites": list(self.favorites), "last_playlist_path": self.last_playlist_path}, f)
-        except: pass
+        pos, size = self.get_position(), self.get_size()
+        self.config.set(x=pos[0], y=pos[1], w=size[0], h=size[1], current_group=self.current_group, last_playing=self.current_playing_path or self.last_file_path, last_playlist_path=self.last_playlist_path, hide_dead=self.hide_dead, epg_path=self.epg_path, prewarm=self.prewarm, remote_refresh_minutes=self.remote_refresh, playlist_sources=self.sources)
     def on_configure_event(self, w, e):
-        self.save_all_data()
+        pos, size = self.get_position(), self.get_size()
+        self.config.set(x=pos[0], y=pos[1], w=size[0], h=size[1])
         return False
     def on_delete_event(self, w, e):
+        self.save_snapshot()
+        self.save_resume()
         self.save_all_data()
+        self.config.flush()
+        self.library.close()
+        self.prober.cancel()
+        self.health.flush()
         Gtk.main_quit()
     def on_drag_data_received(self, w, c, x, y, s, i, t):
         uris = s.get_uris()
-        if uris: self.load_playlist_file(GLib.filename_from_uri(uris[0])[0] if uris[0].startswith("file://") else uris[0])
+        paths = [GLib.filename_from_uri(u)[0] if u.startswith("file://") else u for u in uris or ()]
+        if len(paths) > 1: self.sources = paths; self.load_sources()
+        elif paths: self.load_playlist_file(paths[0])
         c.finish(True, False, t)
     def auto_load_last_m3u(self):
-        if self.last_playlist_path and os.path.exists(self.last_playlist_path): self.load_playlist_file(self.last_playlist_path)
+        if self.sources: self.load_sources(attach=True)
+        elif self.last_playlist_path and (os.path.exists(self.last_playlist_path) or m3u.is_url(self.last_playlist_path)): self.load_playlist_file(self.last_playlist_path, attach=True)
         return False
     def on_vol_changed(self, scale):
         v = int(scale.get_value())
         self.send_command({"command": ["set_property", "volume", v]})
     def on_fab_clicked(self, btn):
-        if not self.revealer.get_reveal_child():
-            res = self.send_command({"command": ["get_property", "volume"]})
-            if res and "data" in res: self.vol_scale.set_value(res["data"])
+        if not self.revealer.get_reveal_child() and self.volume is not None:
+            with self.vol_scale.handler_block_by_func(self.on_vol_changed): self.vol_scale.set_value(self.volume)
         self.revealer.set_reveal_child(not self.revealer.get_reveal_child())
 if __name__ == "__main__":
     win = MPVGTKManager()
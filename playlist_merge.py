@@ -0,0 +1,76 @@
+import os, hashlib, threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+import m3u
+import remote_m3u
+SourceStats = namedtuple("SourceStats", "source total kept dup_url dup_channel")
+DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+UNGROUPED = "Uncategorized"
+def url_key(url, hosts=None):
+    url = url.strip(); i = url.find("://")
+    if i < 0: return os.path.normcase(os.path.normpath(url))
+    j = url.find("/", i + 3)
+    if j < 0: j = len(url)
+    head = url[:j]; h = hosts.get(head) if hosts is not None else None
+    if h is None:
+        scheme, host = url[:i].lower(), url[i + 3:j].lower(); d = DEFAULT_PORTS.get(scheme)
+        if d and host.endswith(d): host = host[:-len(d)]
+        h = f"{scheme}://{host}"
+        if hosts is not None: hosts[head] = h
+    rest = url[j:]
+    return h + (rest.split("#", 1)[0] if "#" in rest else rest or "/")
+def _resolver(src):
+    if remote_m3u.is_url(src): return lambda u: u if not u or "://" in u else urljoin(src, u)
+    return lambda u: u and m3u.resolve(src, u)
+def merge(sources):
+    out, urls, ids, names, groups, gmap, hosts, stats = [], set(), {}, {}, {}, {}, {}, []
+    for src, entries in sources:
+        res, kept, du, dc = _resolver(src), 0, 0, 0
+        for e in entries or ():
+            url = res(e.url); k = url_key(url, hosts)
+            if k in urls: du += 1; continue
+            g = gmap.get(e.group)
+            if g is None: g = gmap[e.group] = groups.setdefault(m3u.normalize(e.group), e.group or UNGROUPED)
+            nm, tid = m3u.normalize(e.name), e.tvg_id.strip().lower()
+            hit = ids.get(tid) if tid else None
+            if hit is None and nm:
+                hit = names.get(nm)
+                if hit is not None and tid and out[hit].tvg_id: hit = None
+            if hit is not None:
+                dc += 1; w = out[hit]
+                if (w.group == UNGROUPED and g != UNGROUPED) or (tid and not w.tvg_id) or (e.logo and not w.logo):
+                    out[hit] = w._replace(group=g if w.group == UNGROUPED else w.group, tvg_id=w.tvg_id or e.tvg_id, logo=w.logo or res(e.logo))
+                    if tid: ids.setdefault(tid, hit)
+                continue
+            urls.add(k); kept += 1
+            if tid: ids[tid] = len(out)
+            if nm: names.setdefault(nm, len(out))
+            logo = res(e.logo)
+            out.append(e if url is e.url and g is e.group and logo is e.logo else e._replace(url=url, group=g, logo=logo))
+        stats.append(SourceStats(src, len(entries or ()), kept, du, dc))
+    return out, stats
+def merged_path(sources): return os.path.join(m3u.CACHE_DIR, "merged-" + hashlib.sha1("\n".join(sources).encode()).hexdigest()[:16] + ".m3u")
+def _extinf(e):
+    attrs = "".join(f' {k}="{v.replace(chr(34), chr(39))}"' for k, v in (("tvg-id", e.tvg_id), ("tvg-logo", e.logo), ("group-title", e.group)) if v)
+    return f"#EXTINF:{e.duration:g}{attrs},{e.name}\n{e.url}\n"
+def write(path, entries):
+    os.makedirs(os.path.dirname(path), exist_ok=True); tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: f.write("#EXTM3U\n"); f.writelines(map(_extinf, entries))
+    os.replace(tmp, path); m3u.write_cache(path, entries)
+def _load_one(src, force):
+    if remote_m3u.is_url(src): return remote_m3u.load(src, force)[1] or []
+    try: return m3u.load(src)
+    except OSError: return []
+def load(sources, force=False):
+    with ThreadPoolExecutor(max_workers=min(8, len(sources) or 1)) as ex: lists = list(ex.map(lambda s: _load_one(s, force), sources))
+    entries, stats = merge(zip(sources, lists))
+    path = merged_path(sources); write(path, entries)
+    return path, entries, stats
+def load_async(sources, callback, force=False):
+    sources = list(sources)
+    def run():
+        try: path, entries, stats = load(sources, force)
+        except OSError: path, entries, stats = merged_path(sources), None, []
+        callback(path, entries, stats)
+    t = threading.Thread(target=run, daemon=True); t.start(); return t
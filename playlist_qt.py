@@ -1,18 +1,82 @@
+import time
+STARTED = time.perf_counter()
 import sys
-import socket
-import json
 import os
 import subprocess
-import re
 import threading
-import glob
-from pathlib import Path
-from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QListView, QPushButton, QFileDialog, QAbstractItemView, QFrame, QMenu, QSlider, QLabel, QToolTip)
-from PySide6.QtCore import Qt, QTimer, Signal, QObject, QPoint, QItemSelectionModel
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QColor, QFont, QIcon
+import mpv_ipc
+from playlist_reorder import plan_moves, apply_moves
+from mpv_discovery import SocketDiscovery
+from playlist_search import SearchIndex
+from config_store import ConfigStore
+from playlist_store import EntryStore, sort_entries, Entry, GroupIndex, group_id, FAVORITES, RECENT, MOST_PLAYED
+from library_db import LibraryDB
+from playlist_sync import fetch_playlist
+from player_registry import PlayerRegistry
+from zap import ZapTracker, Prewarmer, EVENTS as ZAP_EVENTS
+import view_snapshot
+from update_scheduler import UpdateScheduler
+from stream_health import HealthStore, HealthProber
+import m3u
+import epg
+from perf_stats import STATS
+from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QListView, QPushButton, QFileDialog, QAbstractItemView, QFrame, QMenu, QSlider, QLabel, QToolTip, QDialog, QPlainTextEdit, QInputDialog)
+from PySide6.QtCore import Qt, QTimer, Signal, QObject, QPoint, QSize, QEvent, QItemSelectionModel, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QColor, QFont, QIcon, QImage
 os.environ["QT_ACCESSIBILITY"] = "0"
 class UpdateSignals(QObject):
-    finished = Signal(object, list, str, bool)
+    finished = Signal(object, list, str, bool, object, int)
+    prop = Signal(str, str, object)
+    progress = Signal(int, int)
+    sockets = Signal(list)
+    loaded = Signal(str, object)
+    synced = Signal(object)
+    preview = Signal(object)
+    health = Signal(int, int)
+    checked = Signal()
+    guide = Signal(str, object)
+    reindexed = Signal(object, object)
+    logo = Signal(str)
+    restored = Signal(object, object, object)
+def decode_logo(data, size):
+    img = QImage.fromData(data)
+    return None if img.isNull() else img.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+class PlaylistModel(QAbstractListModel):
+    def __init__(self, owner):
+        super().__init__()
+        self.owner, self.rows, self.row_by_file = owner, [], None
+        self.bold, self.bg, self.fg, self.dim = QFont(), QColor("#3584e4"), QColor("#ffffff"), QColor("#aaaaaa"); self.bold.setBold(True)
+    def rowCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self.rows)
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows): return None
+        i = self.rows[index.row()]; o = self.owner
+        if role == Qt.DisplayRole:
+            dnm = f"★ {i.name}" if i.name in o.favorites else i.name
+            if o.guide: prog = o.epg_title(i); dnm = f"{dnm}  ·  {prog}" if prog else dnm
+            return (("⏸ " if o.is_paused else "▶  ") + dnm) if i.filename == o.current_playing_filename else dnm
+        if role == o.USER_ROLE: return i.orig_idx
+        if role == Qt.DecorationRole: lg = o.logos and o.url_to_logo.get(i.filename); return o.logos.get(lg) if lg else None
+        if i.filename != o.current_playing_filename: return self.dim if role == Qt.ForegroundRole and i.filename in o.dead_urls else None
+        if role == Qt.FontRole: return self.bold
+        if role == Qt.BackgroundRole: return self.bg
+        if role == Qt.ForegroundRole: return self.fg
+        return None
+    def set_rows(self, rows):
+        self.beginResetModel(); self.rows, self.row_by_file = rows, None; self.endResetModel()
+    def row_of(self, filename):
+        if self.row_by_file is None:
+            self.row_by_file = {}
+            for r, i in enumerate(self.rows): self.row_by_file.setdefault(i.filename, r)
+        return self.row_by_file.get(filename, -1)
+    def append_rows(self, rows):
+        if not rows: return
+        n = len(self.rows); self.beginInsertRows(QModelIndex(), n, n + len(rows) - 1)
+        self.rows = self.rows + rows
+        if self.row_by_file is not None:
+            for r, i in enumerate(rows, n): self.row_by_file.setdefault(i.filename, r)
+        self.endInsertRows()
+    def refresh_row(self, r):
+        if 0 <= r < len(self.rows): idx = self.index(r); self.dataChanged.emit(idx, idx)
 class MPVQtManager(QMainWindow):
     USER_ROLE = Qt.UserRole
     def __init__(self):
@@ -22,23 +86,45 @@ class MPVQtManager(QMainWindow):
         self.setAcceptDrops(True)
         self.setWindowTitle("MPV")
         self.socket_path = "/dev/shm/mpvsocket"
+        self.ipc = mpv_ipc.get_client(self.socket_path)
         self.config_file = os.path.expanduser("~/.mpv_qt_config.json")
-        self.favorites = set()
+        self.config = ConfigStore(self.config_file)
+        self.library = LibraryDB(); self.favorites = self.library.favs
         self.sort_mode = 0
         self.current_playing_filename = ""
         self.is_paused = False
         self.current_group = "All"
         self.m3u_groups = {}
-        self.url_to_group = {}
+        self.url_to_group, self.url_to_logo = {}, {}
+        self.m3u_entries = []
         self.full_list = []
-        self.group_counts = {}
-        self.is_updating = False
+        self.search_base = SearchIndex(); self.search_index = self.search_base.attach([])
+        self.group_index = GroupIndex()
+        self.updates, self.update_t0 = UpdateScheduler(self._update_thread, self._sync_thread), 0.0
         self.resume_done = False
         self.last_file = ""
-        self.last_playlist_path = ""
+        self.last_playlist_path, self.remote_refresh, self.remote_pending = "", 360, False
+        self.sources, self.merge_stats = [], {}
+        self.media_title = None
+        self.volume, self.playlist_pos, self.playlist_count = None, -1, None
+        self.guide, self.epg_path, self.tvg_ids, self.epg_ticks = None, "", {}, 0
+        self.zap, self.prewarmer, self.prewarm = ZapTracker(), Prewarmer(), False
+        self.health = HealthStore(); self.prober = HealthProber(self.health); self.dead_urls, self.hide_dead = self.health.dead(), False
         self.load_all_data()
         self.signals = UpdateSignals()
         self.signals.finished.connect(self._finalize_update)
+        self.signals.prop.connect(self.on_property_changed)
+        self.signals.progress.connect(self.on_reorder_progress)
+        self.signals.loaded.connect(self._finalize_load)
+        self.signals.synced.connect(self._apply_sync)
+        self.signals.preview.connect(self._show_preview)
+        self.signals.health.connect(self.on_health_progress)
+        self.signals.checked.connect(self._health_done)
+        self.signals.guide.connect(self._epg_loaded)
+        self.signals.reindexed.connect(self._apply_reindex)
+        self.signals.restored.connect(self._apply_restored)
+        self.logos, self.painted, self.snapshot_path = None, False, view_snapshot.default_path("qt", self.socket_path)
+        self.signals.logo.connect(lambda url: self.tree_view.viewport().update())
         self.apply_styles()
         self.ensure_mpv_running()
         central = QWidget()
@@ -51,7 +137,12 @@ class MPVQtManager(QMainWindow):
         self.search_entry = QLineEdit()
         self.search_entry.setPlaceholderText("Search...")
         self.search_entry.setFixedHeight(28)
-        self.search_entry.textChanged.connect(self.filter_playlist)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True); self.search_timer.setInterval(120)
+        self.search_timer.timeout.connect(self.filter_playlist)
+        self.search_entry.textChanged.connect(self.search_timer.start)
+        self.epg_timer = QTimer(self); self.epg_timer.setInterval(60000); self.epg_timer.timeout.connect(self.on_epg_tick)
+        self.remote_timer = QTimer(self); self.remote_timer.setInterval(max(1, self.remote_refresh) * 60000); self.remote_timer.timeout.connect(self.refresh_remote); self.remote_timer.start()
         self.group_btn = QPushButton("▾")
         self.group_btn.setFixedSize(28, 28)
         self.burger_btn = QPushButton("≡")
@@ -64,9 +155,14 @@ class MPVQtManager(QMainWindow):
         self.tree_view.setFrameShape(QFrame.NoFrame)
         self.tree_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.tree_view.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.list_model = QStandardItemModel()
+        self.tree_view.setUniformItemSizes(True)
+        self.list_model = PlaylistModel(self)
         self.tree_view.setModel(self.list_model)
         self.tree_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tree_view.setIconSize(QSize(24, 24))
+        self.tree_view.viewport().installEventFilter(self)
+        self.logo_timer = QTimer(self); self.logo_timer.setSingleShot(True); self.logo_timer.setInterval(40); self.logo_timer.timeout.connect(self.request_logos)
+        for sig in (self.tree_view.verticalScrollBar().valueChanged, self.tree_view.verticalScrollBar().rangeChanged, self.list_model.modelReset, self.list_model.rowsInserted): sig.connect(self.logo_timer.start)
         self.vbox.addWidget(self.tree_view)
         self.fab_container = QWidget(self)
         self.fab_layout = QVBoxLayout(self.fab_container)
@@ -102,14 +198,16 @@ class MPVQtManager(QMainWindow):
         self.tree_view.clicked.connect(self.on_row_activated)
         self.tree_view.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tree_view.customContextMenuRequested.connect(self.on_right_click)
+        self.restore_snapshot()
         QTimer.singleShot(0, self.auto_load_last_m3u)
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_now_playing)
-        self.timer.start(1000)
-        self.socket_timer = QTimer()
-        self.socket_timer.timeout.connect(self.refresh_sockets)
-        self.socket_timer.start(5000)
+        if self.epg_path and os.path.exists(self.epg_path): self.load_epg(self.epg_path)
+        self.resume_at, self.resume_every = {}, 5.0
+        self.players = PlayerRegistry(lambda p, n, v: self.signals.prop.emit(p.path, n, v), self._on_player_event, ("file-loaded", "shutdown") + ZAP_EVENTS, seed=self._seed_player, on_state=self._on_player_state)
+        self.player = self.players.focus(self.socket_path); self.sync = self.player.sync
+        if self.prewarm: self.apply_prefetch()
         self.available_sockets = []
+        self.signals.sockets.connect(self.on_sockets_changed)
+        self.discovery = SocketDiscovery(self.signals.sockets.emit).start()
     def apply_styles(self):
         self.setStyleSheet("""
             QMainWindow { background-color: #ffffff; }
@@ -135,12 +233,10 @@ class MPVQtManager(QMainWindow):
         """)
     def toggle_fab(self):
         self.sub_buttons.setVisible(not self.sub_buttons.isVisible())
-        if self.sub_buttons.isVisible():
-            res = self.send_command({"command": ["get_property", "volume"]})
-            if res and "data" in res:
-                self.vol_slider.blockSignals(True)
-                self.vol_slider.setValue(int(res["data"]))
-                self.vol_slider.blockSignals(False)
+        if self.sub_buttons.isVisible() and self.volume is not None:
+            self.vol_slider.blockSignals(True)
+            self.vol_slider.setValue(int(self.volume))
+            self.vol_slider.blockSignals(False)
         self.update_fab_pos()
     def on_vol_changed(self, val):
         self.send_command({"command": ["set_property", "volume", val]})
@@ -149,10 +245,12 @@ class MPVQtManager(QMainWindow):
     def resizeEvent(self, event):
         super().resizeEvent(event)
         self.update_fab_pos()
-        self.save_all_data()
+        self.save_geometry()
     def moveEvent(self, event):
         super().moveEvent(event)
-        self.save_all_data()
+        self.save_geometry()
+    def save_geometry(self):
+        self.config.set(x=self.x(), y=self.y(), w=self.width(), h=self.height())
     def update_fab_pos(self):
         w = 32
         h = 32 if not self.sub_buttons.isVisible() else (32 + 6 + 32 + 6 + 32 + 6 + 32 + 6 + 120)
@@ -161,117 +259,162 @@ class MPVQtManager(QMainWindow):
     def ensure_mpv_running(self):
         if not os.path.exists(self.socket_path):
             subprocess.Popen(["mpv", "--idle", f"--input-ipc-server={self.socket_path}"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
-    def refresh_sockets(self):
-        sockets = glob.glob("/dev/shm/mpvsocket*") + glob.glob("/tmp/mpvsocket*")
-        new_sockets = []
-        for s in sockets:
-            old_p = self.socket_path
-            self.socket_path = s
-            title_res = self.send_command({"command": ["get_property", "media-title"]})
-            self.socket_path = old_p
-            label = title_res.get("data") if (title_res and title_res.get("data")) else os.path.basename(s)
-            new_sockets.append((s, label))
-        self.available_sockets = new_sockets
+    def on_sockets_changed(self, sockets):
+        self.available_sockets = sockets
+        threading.Thread(target=self.players.update, args=(sockets, (self.socket_path,)), daemon=True).start()
     def switch_socket(self, path):
-        self.socket_path = path
-        self.update_playlist()
+        if path == self.socket_path: return
+        self.updates.cancel()
+        self.player = p = self.players.focus(path)
+        self.socket_path, self.ipc, self.sync = path, p.client, p.sync
+        if self.prewarm: self.apply_prefetch()
+        st = p.state; self.media_title, self.volume, self.playlist_pos = st.get("media-title"), st.get("volume"), st.get("playlist-pos", -1)
+        self.setWindowTitle(str(self.media_title) if self.media_title is not None else "MPV")
+        if p.view is None:
+            self.full_list, self.playlist_count = [], None; self.list_model.set_rows([])
+            self.update_playlist(); return
+        self.full_list, self.group_index, self.search_index, self.playlist_count = p.view
+        self.current_playing_filename, self.is_paused = st.get("path") or "", bool(st.get("pause"))
+        self.filter_playlist()
+        count = st.get("playlist-count")
+        if count is not None and count != self.playlist_count: self.updates.request(full=False)
+    def _seed_player(self, p):
+        res = fetch_playlist(p.client)
+        if res is None: return
+        fl = [Entry(nm, fn, k, group_id(self.entry_group(fn, nm))) for k, (fn, nm) in enumerate((fn, (t or os.path.basename(fn)).strip()) for fn, t in res)]
+        with self.lock: fc = set(self.favorites)
+        view = (fl, GroupIndex(fl, fc, self.virtual_groups()), self.search_base.attach(fl, key=epg.search_key(self.guide, self.tvg_ids)), len(fl))
+        if p.view is not None or p.path == self.socket_path: return
+        p.sync.reset([x.filename for x in fl], [x.name for x in fl]); p.view = view
+    def pause_all(self, on): threading.Thread(target=self.players.pause_all, args=(on,), daemon=True).start()
+    def volume_all(self, vol): threading.Thread(target=self.players.volume_all, args=(vol,), daemon=True).start()
     def load_all_data(self):
+        c = self.config.load()
         with self.lock:
             try:
-                if os.path.exists(self.config_file):
-                    with open(self.config_file, "r", encoding="utf-8") as f:
-                        c = json.load(f)
-                        self.move(c.get("x", 100), c.get("y", 100))
-                        self.resize(c.get("w", 280), c.get("h", 750))
-                        self.favorites = set(c.get("favorites", []))
-                        self.last_file = c.get("last_file", "")
-                        self.last_playlist_path = c.get("last_playlist_path", "")
-                        self.current_group = c.get("current_group", "All")
-                        self.sort_mode = c.get("sort_mode", 0)
+                self.move(c.get("x", 100), c.get("y", 100))
+                self.resize(c.get("w", 280), c.get("h", 750))
+                if c.get("favorites"): self.library.import_favorites(c["favorites"]); self.config.set(favorites=[])
+                self.last_file = c.get("last_file", "")
+                self.last_playlist_path = c.get("last_playlist_path", "")
+                self.remote_refresh = int(c.get("remote_refresh_minutes", 360))
+                self.sources = [s for s in c.get("playlist_sources", []) if s]
+                self.current_group = c.get("current_group", "All")
+                self.sort_mode = c.get("sort_mode", 0)
+                self.hide_dead = bool(c.get("hide_dead", False))
+                self.epg_path = c.get("epg_path", "")
+                self.prewarm = bool(c.get("prewarm", False))
+                STATS.enabled = STATS.enabled or bool(c.get("stats"))
             except: pass
     def save_all_data(self):
-        pr = self.send_command({"command": ["get_property", "path"]})
-        cp = pr.get("data", "") if pr else self.last_file
-        with self.lock:
-            try:
-                Path(os.path.dirname(self.config_file) or ".").mkdir(parents=True, exist_ok=True)
-                with open(self.config_file, "w", encoding="utf-8") as f:
-                    json.dump({
-                        "x": self.x(), "y": self.y(), "w": self.width(), "h": self.height(),
-                        "favorites": list(self.favorites),
-                        "last_file": cp,
-                        "last_playlist_path": self.last_playlist_path,
-                        "current_group": self.current_group,
-                        "sort_mode": self.sort_mode
-                    }, f)
-            except: pass
+        self.config.set(x=self.x(), y=self.y(), w=self.width(), h=self.height(), last_file=self.current_playing_filename or self.last_file,
+                        last_playlist_path=self.last_playlist_path, current_group=self.current_group, sort_mode=self.sort_mode, hide_dead=self.hide_dead, epg_path=self.epg_path, prewarm=self.prewarm, remote_refresh_minutes=self.remote_refresh, playlist_sources=self.sources)
+    def eventFilter(self, obj, ev):
+        if ev.type() == QEvent.Paint and not self.painted and self.list_model.rows:
+            self.painted = True; STATS.record("startup", "first painted row", STARTED)
+            if os.environ.get("MPV_PM_STARTUP_PROBE"): print(f"first-paint {(time.perf_counter() - STARTED) * 1000:.1f} ms rows={len(self.list_model.rows)}", flush=True); QTimer.singleShot(0, QApplication.quit)
+        return False
+    def restore_snapshot(self):
+        snap = view_snapshot.load(self.snapshot_path)
+        if snap is None or snap.meta.get("playlist", "") != self.last_playlist_path or snap.meta.get("group") != self.current_group: return
+        self.full_list, self.current_playing_filename, self.is_paused = snap.entries, snap.meta.get("current", ""), bool(snap.meta.get("paused"))
+        self.list_model.set_rows([i for i in snap.shown if i.filename not in self.dead_urls] if self.hide_dead and self.dead_urls else snap.shown); self.select_playing()
+        threading.Thread(target=lambda: self.signals.restored.emit(snap.entries, GroupIndex(snap.entries, snap.favorites, self.virtual_groups()), self.search_base.attach(snap.entries)), daemon=True).start()
+    def _apply_restored(self, fl, gi, si):
+        if fl is not self.full_list: return
+        self.group_index, self.search_index = gi, si
+        self.filter_playlist()
+    def save_snapshot(self):
+        if not self.full_list: return
+        gp = self.group_index.positions(self.current_group)
+        view_snapshot.save(self.snapshot_path, self.full_list, range(len(self.full_list)) if gp is None else gp, self.favorites, playlist=self.last_playlist_path, group=self.current_group, current=self.current_playing_filename, paused=self.is_paused)
     def closeEvent(self, event):
-        self.save_all_data()
+        self.save_snapshot()
+        self.save_resume(); self.save_all_data(); self.config.flush(); self.prober.cancel(); self.health.flush(); self.library.close()
         super().closeEvent(event)
     def send_command(self, cmd, timeout=0.5):
-        try:
-            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as c:
-                c.settimeout(timeout); c.connect(self.socket_path); c.sendall(json.dumps(cmd).encode() + b"\n")
-                res = b""
-                while True:
-                    chunk = c.recv(16384)
-                    if not chunk: break
-                    res += chunk
-                    if res.endswith(b"\n"): break
-                if res:
-                    for line in res.decode(errors="ignore").splitlines():
-                        try:
-                            data = json.loads(line)
-                            if "request_id" in data or "error" in data or "data" in data: return data
-                        except: continue
-        except: return None
+        return self.ipc.command(cmd, timeout)
     def _normalize(self, s):
-        return re.sub(r'\W+', '', s).lower() if s else ""
+        return m3u.normalize(s)
     def update_playlist(self):
-        if self.is_updating: return
-        self.is_updating = True; threading.Thread(target=self._update_thread, daemon=True).start()
-    def _update_thread(self):
-        res = self.send_command({"command": ["get_property", "playlist"]})
-        curr = self.send_command({"command": ["get_property", "path"]})
-        pause_res = self.send_command({"command": ["get_property", "pause"]})
+        if not self.updates.busy: self.update_t0 = STATS.now()
+        self.updates.request()
+    def _update_thread(self, gen):
+        player = self.player; ipc, sync = player.client, player.sync
+        with STATS.span("update", "fetch"):
+            res, player.fetched = player.fetched, None
+            if res is None: res = fetch_playlist(ipc, on_page=None if sync.files else lambda a, part: self.signals.preview.emit(part))
+            curr, pause_res = ipc.command_many([{"command": ["get_property", "path"]}, {"command": ["get_property", "pause"]}], 0.5)
         cp = curr.get("data", "") if curr else ""
         ps = pause_res.get("data", False) if pause_res else False
-        if not res or "data" not in res: self.is_updating = False; return
-        gc, items = {}, []
+        if res is None or not self.updates.current(gen): return
+        store = EntryStore()
         with self.lock: fc = set(self.favorites)
-        for idx, i in enumerate(res["data"]):
-            fn = i.get("filename", ""); title = i.get("title") or os.path.basename(fn)
-            nm = title.strip()
-            norm_nm = self._normalize(nm)
-            grp = self.url_to_group.get(fn) or self.m3u_groups.get(norm_nm) or "Uncategorized"
-            gc[grp] = gc.get(grp, 0) + 1; items.append({"name": nm, "filename": fn, "orig_idx": idx, "group": grp})
-        def sp(x):
-            isf = x["name"] in fc; ing = (self.current_group == "All") or (self.current_group == "★ Favorites" and isf) or (x["group"] == self.current_group); return (not ing, not isf, x["name"].lower())
-        fs = sorted(items, key=sp, reverse=(self.sort_mode == 1))
-        for t_idx, item in enumerate(fs):
-            if item["orig_idx"] != t_idx:
-                self.send_command({"command": ["playlist-move", item["orig_idx"], t_idx]})
-                for o in items:
-                    if o["orig_idx"] < item["orig_idx"] and o["orig_idx"] >= t_idx: o["orig_idx"] += 1
-                item["orig_idx"] = t_idx
-        self.signals.finished.emit(gc, fs, cp, ps)
-    def _finalize_update(self, group_counts, full_sorted, curr_path, is_paused):
-        self.full_list, self.group_counts, self.current_playing_filename, self.is_paused = full_sorted, group_counts, curr_path or "", is_paused; self.filter_playlist()
+        with STATS.span("update", "group mapping"):
+            for fn, t in res:
+                nm = (t or os.path.basename(fn)).strip()
+                store.add(nm, fn, self.entry_group(fn, nm))
+        virtual = self.virtual_groups(); vm = virtual.get(self.current_group)
+        with STATS.span("update", "sort"): fs = sort_entries(store.entries, fc, self.current_group, self.sort_mode == 1, self.dead_urls, set(vm) if vm is not None else None)
+        with STATS.span("update", "reorder"):
+            moves = plan_moves([x.orig_idx for x in fs])
+            if moves and not apply_moves(ipc, moves, progress=self.signals.progress.emit, cancelled=self.updates.stale(gen)): return
+        for t_idx, item in enumerate(fs): item.orig_idx = t_idx
+        with STATS.span("update", "index"): gi, si = GroupIndex(fs, fc, virtual), self.search_base.attach(fs, key=epg.search_key(self.guide, self.tvg_ids))
+        if not self.updates.current(gen): return
+        sync.reset([x.filename for x in fs], [x.name for x in fs]); player.view = (fs, gi, si, len(fs))
+        self.signals.finished.emit(gi, fs, cp, ps, si, gen)
+    def entry_group(self, fn, nm):
+        return self.url_to_group.get(fn) or self.m3u_groups.get(self._normalize(nm)) or "Uncategorized"
+    def _sync_thread(self, gen):
+        player = self.player
+        if player.view is None: self.signals.synced.emit((gen, player.path, None)); return
+        ops = player.sync.sync()
+        if not ops: self.signals.synced.emit((gen, player.path, ops if ops is None else player.view)); return
+        fl = list(player.view[0])
+        for op in ops:
+            if op[0] == "insert":
+                fl[op[1]:op[1]] = [Entry(nm, fn, 0, group_id(self.entry_group(fn, nm))) for fn, nm in ((fn, (t or os.path.basename(fn)).strip()) for fn, t in op[2])]
+            else: del fl[op[1]:op[1] + op[2]]
+        for p, e in enumerate(fl): e.orig_idx = p
+        with self.lock: fc = set(self.favorites)
+        player.view = (fl, GroupIndex(fl, fc, self.virtual_groups()), self.search_base.attach(fl, key=epg.search_key(self.guide, self.tvg_ids)), len(fl))
+        self.signals.synced.emit((gen, player.path, player.view, ops))
+    def _show_preview(self, part):
+        if self.full_list: return
+        self.list_model.set_rows([Entry(nm, fn, p, group_id(self.entry_group(fn, nm))) for p, (fn, nm) in enumerate((fn, (t or os.path.basename(fn)).strip()) for fn, t in part)])
+    def _apply_sync(self, res):
+        gen, path, view, *ops = res
+        if not self.updates.current(gen) or path != self.socket_path: return
+        if view is None: self.update_playlist(); return
+        if not ops: self.playlist_count = view[3]; return
+        ops, old_n = ops[0], len(self.full_list)
+        self.full_list, self.group_index, self.search_index, self.playlist_count = view
+        if len(ops) == 1 and ops[0][0] == "insert" and ops[0][1] == old_n and not self.search_entry.text().strip():
+            with self.lock: fc = set(self.favorites)
+            self.list_model.append_rows([i for i in self.full_list[old_n:] if self.row_visible(i, fc)])
+        else: self.filter_playlist()
+    def on_reorder_progress(self, done, total):
+        self.setWindowTitle(f"Sorting {done * 100 // total}%" if done < total else (str(self.media_title) if self.media_title is not None else "MPV"))
+    def _finalize_update(self, group_index, full_sorted, curr_path, is_paused, search_index, gen):
+        if not self.updates.current(gen): return
+        self.search_index = search_index
+        self.full_list, self.group_index, self.current_playing_filename, self.is_paused = full_sorted, group_index, curr_path or "", is_paused
+        self.playlist_count = len(full_sorted)
+        with STATS.span("update", "view rebuild"): self.filter_playlist()
         if not self.resume_done and self.last_file:
             for item in self.full_list:
-                if item["filename"] == self.last_file: self.send_command({"command": ["set_property", "playlist-pos", item["orig_idx"]]}); self.send_command({"command": ["set_property", "pause", True]}); self.resume_done = True; break
-        self.is_updating = False
+                if item.filename == self.last_file: self.send_command({"command": ["set_property", "playlist-pos", item.orig_idx]}); self.send_command({"command": ["set_property", "pause", True]}); self.resume_done = True; break
+        STATS.record("update", "total", self.update_t0)
     def show_group_menu(self):
-        menu = QMenu(self); self.update_fab_pos()
-        with self.lock: fc = set(self.favorites)
-        f_count = sum(1 for x in self.full_list if x["name"] in fc)
-        for gn, c in [("All", len(self.full_list)), ("★ Favorites", f_count)]:
-            lbl = f"{gn} ({c})"
+        menu = QMenu(self); self.update_fab_pos(); gi = self.group_index
+        for gn in ("All", FAVORITES, RECENT, MOST_PLAYED):
+            lbl = f"{gn} ({gi.count(gn)})"
             if self.current_group == gn: lbl = f"• {lbl}"
             menu.addAction(lbl).triggered.connect(lambda chk=False, n=gn: self.set_active_group(n))
         menu.addSeparator()
-        for g in sorted(self.group_counts.keys()):
-            lbl = f"{g} ({self.group_counts[g]})"
+        for g in gi.groups():
+            lbl = f"{g} ({gi.count(g)})"
             if self.current_group == g: lbl = f"• {lbl}"
             menu.addAction(lbl).triggered.connect(lambda chk=False, n=g: self.set_active_group(n))
         menu.exec(self.group_btn.mapToGlobal(QPoint(0, self.group_btn.height())))
@@ -280,71 +423,239 @@ class MPVQtManager(QMainWindow):
     def show_burger_menu(self):
         menu = QMenu(self)
         menu.addAction("Open Playlist").triggered.connect(self.on_load_clicked)
+        menu.addAction("Open URL…").triggered.connect(self.on_open_url_clicked)
+        if self.remote_pending: menu.addAction("Apply Playlist Update").triggered.connect(self.apply_remote_update)
+        src_menu = menu.addMenu(f"Sources ({len(self.sources)})" if self.sources else "Merge Playlists")
+        src_menu.addAction("Add Playlist…").triggered.connect(self.on_add_source_clicked)
+        src_menu.addAction("Add URL…").triggered.connect(lambda: self.on_open_url_clicked(True))
+        if self.sources: src_menu.addSeparator()
+        for k, src in enumerate(self.sources):
+            st = self.merge_stats.get(src)
+            sub = src_menu.addMenu(f"{k + 1}. {os.path.basename(src.rstrip('/')) or src}" + (f"  ({st.kept}/{st.total})" if st else ""))
+            if k: sub.addAction("Move Up").triggered.connect(lambda chk=False, k=k: self.move_source(k, -1))
+            if k < len(self.sources) - 1: sub.addAction("Move Down").triggered.connect(lambda chk=False, k=k: self.move_source(k, 1))
+            sub.addAction("Remove").triggered.connect(lambda chk=False, k=k: self.remove_source(k))
+        menu.addAction("Load EPG…").triggered.connect(self.on_load_epg_clicked)
         menu.addAction("Toggle Sort").triggered.connect(self.toggle_sort)
         menu.addAction("Refresh").triggered.connect(self.update_playlist)
+        menu.addAction("Stop Checking" if self.prober.running else "Check Streams").triggered.connect(self.check_streams)
+        hd = menu.addAction("Hide Dead Streams"); hd.setCheckable(True); hd.setChecked(self.hide_dead); hd.triggered.connect(self.toggle_hide_dead)
+        pw = menu.addAction("Pre-warm Neighbours"); pw.setCheckable(True); pw.setChecked(self.prewarm); pw.triggered.connect(self.toggle_prewarm)
+        menu.addAction("Zap Times…").triggered.connect(self.show_zap)
         menu.addSeparator()
         sock_menu = menu.addMenu("Select Player")
         for s_path, s_label in self.available_sockets:
-            lbl = f"✔ {s_label}" if s_path == self.socket_path else s_label
-            sock_menu.addAction(lbl).triggered.connect(lambda chk=False, p=s_path: self.switch_socket(p))
+            pl = self.players.players.get(s_path); lbl = f"{s_label}  {pl.describe()}" if pl and pl.state else s_label
+            sock_menu.addAction(f"✔ {lbl}" if s_path == self.socket_path else lbl).triggered.connect(lambda chk=False, p=s_path: self.switch_socket(p))
+        if len(self.players.players) > 1:
+            sock_menu.addSeparator()
+            sock_menu.addAction("Pause All").triggered.connect(lambda: self.pause_all(True))
+            sock_menu.addAction("Resume All").triggered.connect(lambda: self.pause_all(False))
+            vol_menu = sock_menu.addMenu("Volume All")
+            for v in (25, 50, 75, 100): vol_menu.addAction(f"{v}%").triggered.connect(lambda chk=False, v=v: self.volume_all(v))
         menu.addSeparator()
         menu.addAction("Clear Playlist").triggered.connect(self.on_clear_clicked)
+        if STATS.enabled: menu.addSeparator(); menu.addAction("Stats…").triggered.connect(self.show_stats)
         menu.exec(self.burger_btn.mapToGlobal(QPoint(0, self.burger_btn.height())))
+    def show_stats(self):
+        dlg = QDialog(self); dlg.setWindowTitle("Stats"); dlg.resize(760, 420); lay = QVBoxLayout(dlg)
+        txt = QPlainTextEdit(); txt.setReadOnly(True); txt.setLineWrapMode(QPlainTextEdit.NoWrap); f = QFont("monospace"); f.setStyleHint(QFont.Monospace); txt.setFont(f); lay.addWidget(txt)
+        row = QHBoxLayout(); lay.addLayout(row)
+        refresh = lambda: txt.setPlainText(STATS.summary())
+        def export(trace):
+            p, _ = QFileDialog.getSaveFileName(dlg, "Export", os.path.expanduser("~/mpv-pm-trace.json" if trace else "~/mpv-pm-stats.json"), "JSON (*.json)")
+            if p:
+                try: STATS.export_trace(p) if trace else STATS.export_json(p)
+                except OSError: pass
+        for lbl, cb in (("Refresh", refresh), ("Reset", lambda: (STATS.reset(), refresh())), ("Export JSON", lambda: export(False)), ("Export Trace", lambda: export(True))):
+            b = QPushButton(lbl); b.clicked.connect(cb); row.addWidget(b)
+        refresh(); dlg.exec()
+    def show_zap(self):
+        dlg = QDialog(self); dlg.setWindowTitle("Zap Times"); dlg.resize(640, 360); lay = QVBoxLayout(dlg)
+        txt = QPlainTextEdit(); txt.setReadOnly(True); txt.setLineWrapMode(QPlainTextEdit.NoWrap); f = QFont("monospace"); f.setStyleHint(QFont.Monospace); txt.setFont(f); lay.addWidget(txt)
+        row = QHBoxLayout(); lay.addLayout(row)
+        refresh = lambda: txt.setPlainText(self.zap.summary())
+        for lbl, cb in (("Refresh", refresh), ("Reset", lambda: (self.zap.reset(), refresh()))):
+            b = QPushButton(lbl); b.clicked.connect(cb); row.addWidget(b)
+        refresh(); dlg.exec()
     def filter_playlist(self):
-        self.list_model.clear(); q = self.search_entry.text().lower().strip(); si = None
-        with self.lock: fc = set(self.favorites)
-        for i in self.full_list:
-            nm, grp, idx, fn = i["name"], i["group"], i["orig_idx"], i["filename"]; isf = nm in fc
-            if "Favorites" in self.current_group:
-                if not isf: continue
-            elif "All" not in self.current_group and grp != self.current_group: continue
-            if q and q not in nm.lower(): continue
-            isp = (fn == self.current_playing_filename); dnm = f"★ {nm}" if isf else nm
-            if isp:
-                icon = "⏸ " if self.is_paused else "▶  "
-                dnm = f"{icon}{dnm}"
-            qi = QStandardItem(dnm); qi.setData(idx, self.USER_ROLE)
-            if isp: f = QFont(); f.setBold(True); qi.setFont(f); qi.setBackground(QColor("#3584e4")); qi.setForeground(QColor("#ffffff"))
-            self.list_model.appendRow(qi)
-            if isp: si = qi.index()
-        if si: self.tree_view.selectionModel().setCurrentIndex(si, QItemSelectionModel.ClearAndSelect); self.tree_view.scrollTo(si, QAbstractItemView.PositionAtCenter)
-    def update_now_playing(self):
-        res = self.send_command({"command": ["get_property", "path"]})
-        ps_res = self.send_command({"command": ["get_property", "pause"]})
-        needs_refresh = False
-        if res and "data" in res and res["data"] != self.current_playing_filename:
-            self.current_playing_filename = res["data"]
-            needs_refresh = True
-        if ps_res and "data" in ps_res and ps_res["data"] != self.is_paused:
-            self.is_paused = ps_res["data"]
-            needs_refresh = True
-        if needs_refresh: self.filter_playlist()
-        res_t = self.send_command({"command": ["get_property", "media-title"]})
-        self.setWindowTitle(str(res_t.get('data')) if (res_t and "data" in res_t) else "MPV")
+        with STATS.span("ui", "filter_playlist"): self._filter_playlist()
+    def _filter_playlist(self):
+        q = self.search_entry.text()
+        hits, gp = self.search_index.search(q, fuzzy=True), self.group_index.positions(self.current_group)
+        if hits is None: src = range(len(self.full_list)) if gp is None else gp
+        elif gp is None: src = hits
+        else: gs = set(gp); src = [p for p in hits if p in gs]
+        fl = self.full_list; rows = [fl[p] for p in src]
+        if self.hide_dead and self.dead_urls: dead = self.dead_urls; rows = [i for i in rows if i.filename not in dead]
+        self.list_model.set_rows(rows); self.select_playing()
+    def row_visible(self, i, fc):
+        if self.hide_dead and i.filename in self.dead_urls: return False
+        if self.current_group == FAVORITES: return i.name in fc
+        if self.current_group in (RECENT, MOST_PLAYED): return False
+        return self.current_group == "All" or i.group == self.current_group
+    def select_playing(self):
+        r = self.list_model.row_of(self.current_playing_filename)
+        if r >= 0: si = self.list_model.index(r); self.tree_view.selectionModel().setCurrentIndex(si, QItemSelectionModel.ClearAndSelect); self.tree_view.scrollTo(si, QAbstractItemView.PositionAtCenter)
+    def set_now_playing(self, filename, paused):
+        m = self.list_model; old = m.row_of(self.current_playing_filename)
+        moved = filename != self.current_playing_filename
+        self.current_playing_filename, self.is_paused = filename, paused
+        m.refresh_row(old)
+        if moved: m.refresh_row(m.row_of(filename)); self.select_playing()
+    def _on_player_event(self, p, ev):
+        if ev.get("event") in ("end-file", "shutdown"): self.save_resume(p)
+        if p.path != self.socket_path: return
+        if ev.get("event") == "file-loaded": self._on_file_loaded(ev)
+        elif self.zap.on_event(ev) and self.prewarm: self.warm_neighbours()
+    def toggle_prewarm(self):
+        self.prewarm = not self.prewarm; self.save_all_data()
+        if self.prewarm: self.apply_prefetch(); self.warm_neighbours()
+    def apply_prefetch(self):
+        ipc = self.ipc; threading.Thread(target=lambda: ipc.wait_connected() and self.prewarmer.prefetch(ipc), daemon=True).start()
+    def warm_neighbours(self):
+        fl, i = self.full_list, self.player.state.get("playlist-pos")
+        self.prewarmer.warm([fl[j].filename for j in ((i + 1, i - 1) if i is not None else ()) if 0 <= j < len(fl)] + self.library.recent(4))
+    def on_property_changed(self, path, name, val):
+        if path != self.socket_path: return
+        if name == "path":
+            if (val or "") != self.current_playing_filename:
+                if val: r = self.list_model.row_of(val); self.library.played(val, self.list_model.rows[r].name if r >= 0 else os.path.basename(val))
+                self.set_now_playing(val or "", self.is_paused)
+        elif name == "pause":
+            if bool(val) != self.is_paused: self.set_now_playing(self.current_playing_filename, bool(val))
+        elif name == "media-title": self.media_title = val; self.setWindowTitle(str(val) if val is not None else "MPV")
+        elif name == "volume":
+            self.volume = val
+            if val is not None and self.sub_buttons.isVisible(): self.vol_slider.blockSignals(True); self.vol_slider.setValue(int(val)); self.vol_slider.blockSignals(False)
+        elif name == "playlist-pos": self.playlist_pos = -1 if val is None else val; self.sync.set_current(val)
+        elif name == "playlist-count":
+            if self.playlist_count is not None and val != self.playlist_count: self.updates.request(full=False)
+    def check_streams(self):
+        if self.prober.running: self.prober.cancel(); return
+        urls = self.health.stale([i.filename for i in self.full_list])
+        if not urls: self._health_done(); return
+        self.prober.check(urls, on_progress=self.signals.health.emit, on_done=self.signals.checked.emit)
+    def on_health_progress(self, done, total):
+        self.setWindowTitle(f"Checking {done * 100 // total}%" if done < total else (str(self.media_title) if self.media_title is not None else "MPV"))
+    def _health_done(self):
+        self.dead_urls = self.health.dead(); self.update_playlist()
+    def toggle_hide_dead(self): self.hide_dead = not self.hide_dead; self.save_all_data(); self.filter_playlist()
+    def epg_title(self, i):
+        return self.guide.title_now(epg.entry_key(self.tvg_ids, i)) if self.guide else ""
+    def on_load_epg_clicked(self):
+        p, _ = QFileDialog.getOpenFileName(self, "XMLTV", "", "XMLTV (*.xml *.xml.gz *.gz);;All (*)")
+        if p: self.load_epg(p)
+    def load_epg(self, path): epg.load_async(path, self.signals.guide.emit)
+    def _epg_loaded(self, path, guide):
+        if guide is None: return
+        self.guide, self.epg_path = guide, path; self.save_all_data(); self.epg_timer.start(); self.update_playlist()
+    def on_epg_tick(self):
+        if not self.guide: return
+        self.tree_view.viewport().update(); self.epg_ticks += 1
+        if self.epg_ticks % 5 == 0: threading.Thread(target=self._reindex_thread, args=(self.full_list,), daemon=True).start()
+    def _reindex_thread(self, fl): self.signals.reindexed.emit(fl, self.search_base.attach(fl, key=epg.search_key(self.guide, self.tvg_ids)))
+    def _apply_reindex(self, fl, si):
+        if fl is not self.full_list: return
+        self.search_index = si
+        if self.search_entry.text().strip(): self.filter_playlist()
+    def request_logos(self, margin=10):
+        rows, vp = self.list_model.rows, self.tree_view.viewport()
+        if not rows or not self.url_to_logo or self.logos is None: return
+        top, bottom = self.tree_view.indexAt(QPoint(2, 2)).row(), self.tree_view.indexAt(QPoint(2, vp.height() - 2)).row()
+        if top < 0: top = 0
+        if bottom < 0: bottom = len(rows) - 1
+        lg = self.url_to_logo; self.logos.request([lg.get(rows[r].filename) for r in range(max(0, top - margin), min(len(rows), bottom + margin + 1))])
+    def virtual_groups(self): return {RECENT: self.library.recent(), MOST_PLAYED: self.library.most_played()}
+    def _on_file_loaded(self, ev): threading.Thread(target=self._resume_thread, daemon=True).start()
+    def _resume_thread(self):
+        path = self.ipc.get("path"); pos = self.library.resume(path) if path else None
+        if pos and (self.ipc.get("duration") or 0) > pos: self.ipc.command({"command": ["seek", pos, "absolute"]})
+    def save_resume(self, p=None):
+        for pl in [p] if p else self.players.all():
+            st = pl.state; path, dur = st.get("path"), st.get("duration")
+            if path and dur: self.library.set_resume(path, st.get("time-pos"), dur)
+    def _on_player_state(self, p, name, val):
+        if name == "pause" and val: self.save_resume(p)
+        elif name == "time-pos" and val is not None:
+            now = time.monotonic()
+            if now - self.resume_at.get(p.path, 0.0) >= self.resume_every: self.resume_at[p.path] = now; self.save_resume(p)
     def toggle_sort(self): self.sort_mode = 1 - self.sort_mode; self.save_all_data(); self.update_playlist()
-    def load_playlist_file(self, path):
+    def load_playlist_file(self, path, attach=False):
+        if m3u.is_url(path):
+            import remote_m3u
+            remote_m3u.load_async(path, lambda u, local, e, changed: e is not None and self._playlist_parsed(u, e, attach, local)); return
         if not path or not os.path.exists(path): return
-        self.m3u_groups = {}; self.url_to_group = {}
-        try:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                last_group = "Uncategorized"
-                for line in f:
-                    line = line.strip()
-                    if line.startswith("#EXTINF"):
-                        m = re.search(r'group-title="([^"]+)"', line)
-                        last_group = m.group(1) if m else "Uncategorized"
-                        nm = re.search(r',(.+)$', line)
-                        if nm: self.m3u_groups[self._normalize(nm.group(1).strip())] = last_group
-                    elif line and not line.startswith("#"):
-                        self.url_to_group[line] = last_group
-        except: pass
-        self.send_command({"command": ["loadlist", path, "replace"]})
+        m3u.load_async(path, lambda p, e: self._playlist_parsed(p, e, attach))
+    def load_sources(self, attach=False):
+        self.save_all_data()
+        import playlist_merge
+        playlist_merge.load_async(self.sources, lambda p, e, st: e is not None and self._sources_merged(p, e, st, attach))
+    def _sources_merged(self, path, entries, stats, attach):
+        import playlist_merge
+        if path != playlist_merge.merged_path(self.sources): return
+        self.merge_stats = {s.source: s for s in stats}
+        self._playlist_parsed(path, entries, attach)
+    def add_sources(self, paths):
+        if not self.sources and self.last_playlist_path: self.sources = [self.last_playlist_path]
+        self.sources += [p for p in dict.fromkeys(paths) if p not in self.sources]
+        self.load_sources()
+    def move_source(self, k, d): s = self.sources; s[k], s[k + d] = s[k + d], s[k]; self.load_sources()
+    def remove_source(self, k):
+        del self.sources[k]
+        if len(self.sources) > 1: return self.load_sources()
+        rest, self.sources = self.sources, []
+        if rest: self.load_playlist_file(rest[0])
+        else: self.save_all_data()
+    def refresh_remote(self):
+        if any(map(m3u.is_url, self.sources)):
+            import playlist_merge
+            playlist_merge.load_async(self.sources, self._sources_checked)
+        elif m3u.is_url(self.last_playlist_path):
+            import remote_m3u
+            remote_m3u.load_async(self.last_playlist_path, self._remote_checked)
+    def _sources_checked(self, path, entries, stats):
+        if entries is not None: self._remote_checked(path, path, entries, m3u.fingerprint(e.url for e in entries) != m3u.fingerprint(e.url for e in self.m3u_entries), stats)
+    def _remote_checked(self, url, local, entries, changed, stats=None):
+        if entries is None or url != self.last_playlist_path: return
+        if changed and not self.ipc.get("idle-active", False): self.remote_pending = True; return
+        if stats is not None: self.merge_stats = {s.source: s for s in stats}
+        if changed: self._playlist_parsed(url, entries, False, local)
+    def apply_remote_update(self):
+        self.remote_pending = False
+        if self.sources: self.load_sources()
+        else: self.load_playlist_file(self.last_playlist_path)
+    def _playlist_parsed(self, path, entries, attach=False, local=None):
+        entries = entries or []
+        groups, url_groups = {m3u.normalize(e.name): e.group for e in entries if e.name}, {e.url: e.group for e in entries}
+        logos = {m3u.resolve(path, e.url): m3u.resolve(path, e.logo) for e in entries if e.logo}
+        self.ipc.wait_connected()
+        attached = attach and self.player_has_playlist(path, entries)
+        if not attached: self.ipc.command({"command": ["loadlist", local or path, "replace"]}, 30.0)
+        self.signals.loaded.emit(path, (entries, groups, url_groups, logos, attached and bool(self.ipc.get("path"))))
+    def player_has_playlist(self, path, entries):
+        if not entries or self.ipc.get("playlist-count", -1, 2.0) != len(entries): return False
+        pl = [(i.get("filename", ""), i.get("title") or "") for i in self.ipc.get("playlist", [], 10.0)]
+        if m3u.fingerprint(f for f, _ in pl) != m3u.fingerprint(m3u.resolve(path, e.url) for e in entries): return False
+        self.player.fetched = pl
+        return True
+    def _finalize_load(self, path, parsed):
+        self.m3u_entries, self.m3u_groups, self.url_to_group, self.url_to_logo, playing = parsed
+        if self.url_to_logo and self.logos is None:
+            from logo_cache import LogoCache
+            self.logos = LogoCache(decode_logo, self.signals.logo.emit)
+        self.search_base = SearchIndex(); self.tvg_ids = epg.tvg_map(self.m3u_entries)
+        if playing: self.resume_done = True
+        if self.sources:
+            import playlist_merge
+            if path != playlist_merge.merged_path(self.sources): self.sources, self.merge_stats = [], {}
         self.last_playlist_path = path
         self.save_all_data()
-        QTimer.singleShot(500, self.update_playlist)
+        self.update_playlist()
     def auto_load_last_m3u(self):
-        if self.last_playlist_path and os.path.exists(self.last_playlist_path):
-            self.load_playlist_file(self.last_playlist_path)
+        if self.sources: self.load_sources(attach=True)
+        elif self.last_playlist_path and (os.path.exists(self.last_playlist_path) or m3u.is_url(self.last_playlist_path)):
+            self.load_playlist_file(self.last_playlist_path, attach=True)
         else:
             self.update_playlist()
     def dragEnterEvent(self, e):
@@ -352,23 +663,30 @@ class MPVQtManager(QMainWindow):
         else: e.ignore()
     def dropEvent(self, e):
         urls = e.mimeData().urls()
-        if urls: self.load_playlist_file(urls[0].toLocalFile())
+        paths = [u.toLocalFile() if u.isLocalFile() else u.toString() for u in urls]
+        if len(paths) > 1: self.sources = paths; self.load_sources()
+        elif paths: self.load_playlist_file(paths[0])
     def on_load_clicked(self):
         p, _ = QFileDialog.getOpenFileName(self, "Playlist", "", "M3U (*.m3u *.m3u8);;All (*)")
         if p: self.load_playlist_file(p)
-    def on_clear_clicked(self): self.send_command({"command": ["playlist-clear"]}); self.m3u_groups = {}; self.url_to_group = {}; self.update_playlist()
+    def on_add_source_clicked(self):
+        ps, _ = QFileDialog.getOpenFileNames(self, "Add Playlists", "", "M3U (*.m3u *.m3u8);;All (*)")
+        if ps: self.add_sources(ps)
+    def on_open_url_clicked(self, add=False):
+        url, ok = QInputDialog.getText(self, "Add URL" if add else "Open URL", "Playlist URL:", text="" if add or not m3u.is_url(self.last_playlist_path) else self.last_playlist_path)
+        if ok and m3u.is_url(url.strip()): self.add_sources([url.strip()]) if add else self.load_playlist_file(url.strip())
+    def on_clear_clicked(self): self.send_command({"command": ["playlist-clear"]}); self.sources, self.merge_stats = [], {}; self.m3u_groups = {}; self.url_to_group = {}; self.url_to_logo = {}; self.m3u_entries = []; self.update_playlist()
     def on_right_click(self, pos):
         idx = self.tree_view.indexAt(pos)
         if idx.isValid():
-            item = self.list_model.itemFromIndex(idx)
-            if item:
-                name = item.text().replace("★ ", "").replace("▶  ", "").replace("⏸ ", "").strip()
-                with self.lock:
-                    if name in self.favorites: self.favorites.remove(name)
-                    else: self.favorites.add(name)
-                self.save_all_data(); self.update_playlist()
+            i = self.list_model.rows[idx.row()]
+            with self.lock: self.group_index.set_favorite(i.name, self.library.toggle_favorite(i.name, i.filename))
+            if self.current_group == FAVORITES: self.filter_playlist()
+            else: self.list_model.refresh_row(idx.row())
     def on_row_activated(self, idx):
-        oi = idx.data(self.USER_ROLE)
-        if oi is not None: self.send_command({"command": ["set_property", "playlist-pos", oi]}); self.send_command({"command": ["set_property", "pause", False]})
+        if not 0 <= idx.row() < len(self.list_model.rows): return
+        i = self.list_model.rows[idx.row()]; self.zap.begin(i.filename, i.group)
+        fut = self.ipc.pipeline([{"command": ["set_property", "playlist-pos", i.orig_idx]}, {"command": ["set_property", "pause", False]}])[0]
+        fut.add_done_callback(lambda f, url=i.filename: self.zap.ack(url, f.result()))
 if __name__ == "__main__":
     app = QApplication(sys.argv); win = MPVQtManager(); win.show(); sys.exit(app.exec())
@@ -0,0 +1,51 @@
+from bisect import bisect_left
+def _lis_keep(seq):
+    tails, tails_i, prev = [], [], [-1] * len(seq)
+    for i, v in enumerate(seq):
+        k = bisect_left(tails, v)
+        if k == len(tails): tails.append(v); tails_i.append(i)
+        else: tails[k] = v; tails_i[k] = i
+        prev[i] = tails_i[k - 1] if k else -1
+    keep, i = set(), tails_i[-1] if tails_i else -1
+    while i >= 0: keep.add(i); i = prev[i]
+    return keep
+class _Fenwick:
+    def __init__(self, n): self.n, self.t = n, [0] * (n + 1)
+    def add(self, i, d):
+        i += 1
+        while i <= self.n: self.t[i] += d; i += i & -i
+    def prefix(self, i):
+        s = 0
+        while i > 0: s += self.t[i]; i -= i & -i
+        return s
+def plan_moves(order):
+    n = len(order)
+    if n < 2: return []
+    keep = _lis_keep(order)
+    if len(keep) == n: return []
+    span = n + 1
+    slot, new_slot, base, run = [i * span for i in range(n)], {}, -span, 0
+    for t, cur in enumerate(order):
+        if t in keep: base, run = cur * span, 0
+        else: run += 1; new_slot[t] = base + run
+    coords = sorted(set(slot) | set(new_slot.values()))
+    rank = {v: i for i, v in enumerate(coords)}
+    fw = _Fenwick(len(coords))
+    for v in slot: fw.add(rank[v], 1)
+    moves = []
+    for t, cur in enumerate(order):
+        if t in keep: continue
+        src, dst = rank[slot[cur]], rank[new_slot[t]]
+        p = fw.prefix(src); fw.add(src, -1)
+        q = fw.prefix(dst); fw.add(dst, 1)
+        if p != q: moves.append((p, q if q < p else q + 1))
+    return moves
+def apply_moves(client, moves, batch=1000, progress=None, timeout=5.0, cancelled=None):
+    done = 0
+    for i in range(0, len(moves), batch):
+        if cancelled and cancelled(): return False
+        futs = client.pipeline([{"command": ["playlist-move", a, b]} for a, b in moves[i:i + batch]])
+        if futs and client.wait(futs[-1], timeout) is None: return False
+        done += len(futs)
+        if progress: progress(done, len(moves))
+    return True
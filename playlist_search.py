@@ -0,0 +1,55 @@
+from collections import Counter
+def _grams(k): return {k[i:i + 3] for i in range(len(k) - 2)}
+class SearchIndex:
+    def __init__(self):
+        self.keys, self.key_id, self.grams = [], {}, {}
+        self.positions, self.last_q, self.last_ids, self.extra = {}, None, None, None
+    def _key(self, s):
+        k = s.lower(); kid = self.key_id.get(k)
+        if kid is None:
+            kid = self.key_id[k] = len(self.keys); self.keys.append(k)
+            for g in _grams(k): self.grams.setdefault(g, []).append(kid)
+        return kid
+    def attach(self, entries, key=None):
+        ix, ov = SearchIndex.__new__(SearchIndex), SearchIndex()
+        ix.keys, ix.key_id, ix.grams, ix.positions, ix.last_q, ix.last_ids = self.keys, self.key_id, self.grams, {}, None, None
+        for p, e in enumerate(entries):
+            ix.positions.setdefault(self._key(e.name), []).append(p)
+            k = key(e) if key else e.name
+            if k != e.name: ov.positions.setdefault(ov._key(k), []).append(p)
+        ix.extra = ov if ov.keys else None
+        return ix
+    def _candidates(self, q):
+        if self.last_q is not None and self.last_q in q: return self.last_ids
+        gs = _grams(q)
+        if not gs: return range(len(self.keys))
+        lists = sorted((self.grams.get(g, ()) for g in gs), key=len)
+        if not lists[0]: return ()
+        cand = set(lists[0])
+        for l in lists[1:]:
+            cand.intersection_update(l)
+            if not cand: break
+        return cand
+    def match_ids(self, q):
+        q = q.lower().strip()
+        if not q: return None
+        keys = self.keys
+        ids = [kid for kid in self._candidates(q) if q in keys[kid]]
+        self.last_q, self.last_ids = q, ids
+        return ids
+    def fuzzy_ids(self, q, limit=200):
+        q = q.lower().strip(); gs = _grams(q)
+        if len(gs) < 2: return []
+        hits = Counter()
+        for g in gs: hits.update(self.grams.get(g, ()))
+        need = max(1, len(gs) - 3)
+        ranked = [kid for kid, c in hits.most_common() if c >= need]
+        return ranked[:limit]
+    def search(self, q, fuzzy=False):
+        ids = self.match_ids(q)
+        if ids is None: return None
+        pos, extra = self.positions, self.extra
+        hits = [p for kid in ids for p in pos.get(kid, ())]
+        if extra is not None: hits = list(set(hits).union(extra.search(q)))
+        if hits or not fuzzy: return sorted(hits)
+        return [p for kid in self.fuzzy_ids(q) for p in pos.get(kid, ())]
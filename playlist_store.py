@@ -0,0 +1,62 @@
+import sys, threading
+from collections import Counter
+GROUPS, GROUP_IDS, _glock = [], {}, threading.Lock()
+FAVORITES, RECENT, MOST_PLAYED = "★ Favorites", "🕘 Recently Played", "🔥 Most Played"
+def group_id(name):
+    gid = GROUP_IDS.get(name)
+    if gid is None:
+        with _glock:
+            gid = GROUP_IDS.get(name)
+            if gid is None: gid = GROUP_IDS[name] = len(GROUPS); GROUPS.append(sys.intern(name))
+    return gid
+def intern_group(name): return GROUPS[group_id(name)]
+class Entry:
+    __slots__ = ("name", "filename", "orig_idx", "gid")
+    def __init__(self, name, filename, orig_idx, gid): self.name, self.filename, self.orig_idx, self.gid = name, filename, orig_idx, gid
+    @property
+    def group(self): return GROUPS[self.gid]
+class EntryStore:
+    def __init__(self): self.entries, self.pool = [], {}
+    def __len__(self): return len(self.entries)
+    def __iter__(self): return iter(self.entries)
+    def add(self, name, filename, group):
+        p = self.pool; name = p.setdefault(name, name); filename = p.setdefault(filename, filename)
+        e = Entry(name, filename, len(self.entries), group_id(group)); self.entries.append(e)
+        return e
+    def group_counts(self): return group_counts(self.entries)
+def sort_entries(entries, favorites, group="All", reverse=False, dead=frozenset(), members=None):
+    gid = GROUP_IDS.get(group, -1)
+    def key(x):
+        isf = x.name in favorites; ing = (group == "All") or (group == FAVORITES and isf) or (x.gid == gid) or (members is not None and x.filename in members); return (not ing, not isf, x.filename in dead, x.name.lower())
+    return sorted(entries, key=key, reverse=reverse)
+def group_counts(entries): return {GROUPS[g]: c for g, c in Counter(e.gid for e in entries).items()}
+class GroupIndex:
+    def __init__(self, entries=(), favorites=(), virtual=None):
+        self.members, self.by_name, self.virtual = {}, {}, {}
+        for p, e in enumerate(entries):
+            self.members.setdefault(e.gid, []).append(p); self.by_name.setdefault(e.name, []).append(p)
+        self.total, self.favorites = len(entries), set(favorites)
+        self.fav_count = sum(len(self.by_name.get(n, ())) for n in self.favorites)
+        for g, urls in (virtual or {}).items():
+            rank = {}
+            for u in urls: rank.setdefault(u, len(rank))
+            self.virtual[g] = sorted((p for p, e in enumerate(entries) if e.filename in rank), key=lambda p: rank[entries[p].filename])
+    def counts(self): return {GROUPS[g]: len(m) for g, m in self.members.items()}
+    def groups(self): return sorted(GROUPS[g] for g in self.members)
+    def count(self, group):
+        if group == "All": return self.total
+        if group == FAVORITES: return self.fav_count
+        if group in self.virtual: return len(self.virtual[group])
+        gid = GROUP_IDS.get(group)
+        return len(self.members.get(gid, ())) if gid is not None else 0
+    def set_favorite(self, name, on):
+        if on == (name in self.favorites): return
+        n = len(self.by_name.get(name, ()))
+        if on: self.favorites.add(name); self.fav_count += n
+        else: self.favorites.discard(name); self.fav_count -= n
+    def positions(self, group):
+        if group == "All": return None
+        if group == FAVORITES: return sorted(p for n in self.favorites for p in self.by_name.get(n, ()))
+        if group in self.virtual: return self.virtual[group]
+        gid = GROUP_IDS.get(group)
+        return self.members.get(gid, []) if gid is not None else []
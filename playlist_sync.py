@@ -0,0 +1,54 @@
+def _request_range(client, a, b): return client.pipeline([{"command": ["get_property", f"playlist/{n}"]} for n in range(a, b)])
+def _collect(client, futs, timeout):
+    out = []
+    for f in futs:
+        r = client.wait(f, timeout); e = r and r.get("data")
+        if not isinstance(e, dict) or "filename" not in e: return None
+        out.append((e["filename"], e.get("title") or ""))
+    return out
+def fetch_playlist(client, count=None, first=200, on_page=None, small=5000, timeout=5.0):
+    if on_page is not None:
+        if count is None: count = client.get("playlist-count")
+        if count is None: return None
+        if count > small:
+            part = _collect(client, _request_range(client, 0, min(count, first)), timeout)
+            if part is None: return None
+            on_page(0, part)
+    pl = client.get("playlist", None, timeout)
+    return None if pl is None else [(i.get("filename", ""), i.get("title") or "") for i in pl]
+class PlaylistSync:
+    def __init__(self, client, timeout=5.0):
+        self.client, self.timeout, self.files, self.titles, self.current = client, timeout, [], [], -1
+    def reset(self, files, titles=None, current=-1):
+        self.files, self.titles, self.current = list(files), list(titles) if titles is not None else [""] * len(files), current
+    def sync(self, count=None):
+        if count is None: count = self.client.get("playlist-count")
+        if count is None: return None
+        old = len(self.files)
+        if count == old: return []
+        if count == 0:
+            ops = [("remove", 0, old)]; self.reset([]); return ops
+        if not old: return None
+        pl = self.client.get("playlist", None, self.timeout)
+        if pl is None: return None
+        new, files = [e.get("filename", "") for e in pl], self.files
+        n = len(new); k, m = n - old, min(n, old)
+        if k == 0: return None
+        i = 0
+        while i < m and new[i] == files[i]: i += 1
+        s = 0
+        while s < m - i and new[n - 1 - s] == files[old - 1 - s]: s += 1
+        if i + s != m: return None
+        if k > 0:
+            items = [(new[j], pl[j].get("title") or "") for j in range(i, i + k)]
+            files[i:i] = new[i:i + k]; self.titles[i:i] = [t for f, t in items]
+            if self.current >= i: self.current += k
+            return [("insert", i, items)]
+        k = -k
+        del files[i:i + k]; del self.titles[i:i + k]
+        if self.current >= i + k: self.current -= k
+        elif self.current >= i: self.current = -1
+        return [("remove", i, k)]
+    def set_current(self, pos):
+        old, self.current = self.current, -1 if pos is None else pos
+        return [] if old == self.current else [("current", old, self.current)]
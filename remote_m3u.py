@@ -0,0 +1,62 @@
+import os, re, json, time, zlib, hashlib, threading
+import http.client, urllib.request, urllib.error
+from urllib.parse import urljoin, urlsplit
+import m3u
+from m3u import is_url
+URL_ATTR_RE = re.compile(r'((?:tvg-logo|url-logo)=")([^"]*)"', re.I)
+def _base(url): return os.path.join(m3u.CACHE_DIR, "remote", hashlib.sha1(url.encode()).hexdigest())
+def local_path(url): return _base(url) + ".m3u"
+def read_meta(url):
+    try:
+        with open(_base(url) + ".json", "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+def _write_meta(url, meta):
+    fn = _base(url) + ".json"; tmp = f"{fn}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(meta, f)
+    os.replace(tmp, fn)
+def _lines(resp, out, url, chunk):
+    gz = zlib.decompressobj(16 + zlib.MAX_WBITS) if resp.headers.get("Content-Encoding", "").lower() == "gzip" else None
+    buf, u = b"", urlsplit(url); origin = f"{u.scheme}://{u.netloc}"
+    while True:
+        data = resp.read(chunk)
+        if not data: break
+        if gz: data = gz.decompress(data)
+        buf += data; *lines, buf = buf.split(b"\n")
+        for raw in lines: yield _emit(raw, out, url, origin)
+    if gz: buf += gz.flush()
+    if buf: yield _emit(buf, out, url, origin)
+def _emit(raw, out, url, origin):
+    line = raw.decode("utf-8", "ignore").rstrip("\r"); s = line.strip()
+    if s and s[0] != "#" and "://" not in s: line = origin + s if s[0] == "/" and s[:2] != "//" and "/." not in s else urljoin(url, s)
+    elif s.startswith("#EXTINF") and "-logo=" in s: line = URL_ATTR_RE.sub(lambda m: m.group(0) if not m.group(2) or "://" in m.group(2) else f'{m.group(1)}{urljoin(url, m.group(2))}"', line)
+    out.write(line + "\n")
+    return line
+def fetch(url, timeout=30.0, force=False, chunk=1 << 16):
+    local, meta = local_path(url), read_meta(url)
+    hdr = {"User-Agent": "mpv-playlistmanager", "Accept-Encoding": "gzip"}
+    if not force and os.path.exists(local):
+        if meta.get("etag"): hdr["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"): hdr["If-Modified-Since"] = meta["last_modified"]
+    try: resp = urllib.request.urlopen(urllib.request.Request(url, headers=hdr), timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code != 304: raise
+        meta["checked"] = time.time(); _write_meta(url, meta)
+        return local, m3u.load(local), False
+    os.makedirs(os.path.dirname(local), exist_ok=True); tmp = f"{local}.{os.getpid()}.tmp"
+    try:
+        with resp, open(tmp, "w", encoding="utf-8") as out: entries = list(m3u.iter_entries(_lines(resp, out, resp.geturl(), chunk)))
+        if not entries: raise ValueError(f"{url}: no playlist entries")
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+    os.replace(tmp, local); m3u.write_cache(local, entries)
+    _write_meta(url, {"url": url, "etag": resp.headers.get("ETag", ""), "last_modified": resp.headers.get("Last-Modified", ""), "checked": time.time(), "count": len(entries)})
+    return local, entries, True
+def load(url, force=False):
+    try: return fetch(url, force=force)
+    except (OSError, ValueError, http.client.HTTPException):
+        local = local_path(url); return local, (m3u.load(local) if os.path.exists(local) else None), False
+def load_async(url, callback, force=False):
+    def run(): callback(url, *load(url, force))
+    t = threading.Thread(target=run, daemon=True); t.start(); return t
@@ -0,0 +1,124 @@
+import os, time, threading
+from urllib.parse import urlsplit, urljoin, unquote
+from config_store import ConfigStore
+import m3u
+HLS_TYPES = ("mpegurl", "x-mpegurl", "vnd.apple.mpegurl")
+class HealthStore:
+    def __init__(self, path=None, ttl=3600.0):
+        self.ttl, self.store = ttl, ConfigStore(path or os.path.join(m3u.CACHE_DIR, "health.json"), delay=2.0)
+        self.results = {u: tuple(v) for u, v in self.store.load().items() if isinstance(v, list) and len(v) == 3}
+    def put(self, url, ok, detail=""):
+        r = self.results[url] = (bool(ok), time.time(), detail)
+        self.store.set(**{url: list(r)})
+    def get(self, url):
+        r = self.results.get(url)
+        return r if r and time.time() - r[1] < self.ttl else None
+    def alive(self, url):
+        r = self.get(url)
+        return None if r is None else r[0]
+    def dead(self):
+        now = time.time()
+        return frozenset(u for u, (ok, ts, d) in self.results.items() if not ok and now - ts < self.ttl)
+    def stale(self, urls): return [u for u in urls if self.get(u) is None]
+    def flush(self): self.store.flush()
+def _dechunk(raw):
+    out, i = bytearray(), 0
+    while True:
+        nl = raw.find(b"\r\n", i)
+        if nl < 0: break
+        try: n = int(raw[i:nl].split(b";")[0], 16)
+        except ValueError: break
+        if n == 0: break
+        out += raw[nl + 2:nl + 2 + n]; i = nl + 2 + n + 2
+        if i > len(raw): break
+    return bytes(out)
+async def _get(url, timeout, limit, full=False):
+    import asyncio, ssl
+    u = urlsplit(url); tls = u.scheme == "https"
+    host, port = u.hostname or "", u.port or (443 if tls else 80)
+    path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port, ssl=ssl.create_default_context() if tls else None, server_hostname=host if tls else None), timeout)
+    try:
+        hosthdr = host if u.port is None else f"{host}:{u.port}"
+        rng = "" if full else f"Range: bytes=0-{limit - 1}\r\n"
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {hosthdr}\r\nUser-Agent: mpv-playlistmanager\r\nAccept: */*\r\n{rng}Connection: close\r\n\r\n".encode())
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ", 2)
+        status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+        hdr = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+        body = b""
+        if 200 <= status < 300 and status != 204:
+            want = int(hdr["content-length"]) if hdr.get("content-length", "").isdigit() else limit
+            hls = any(t in hdr.get("content-type", "").lower() for t in HLS_TYPES) or u.path.lower().endswith((".m3u8", ".m3u"))
+            buf = bytearray()
+            while len(buf) < min(want, limit):
+                chunk = await asyncio.wait_for(reader.read(limit - len(buf)), timeout)
+                if not chunk: break
+                buf += chunk
+                if not (hls or full): break
+            body = _dechunk(bytes(buf)) if "chunked" in hdr.get("transfer-encoding", "").lower() else bytes(buf)
+        return status, hdr, body
+    finally:
+        writer.close()
+        try: await writer.wait_closed()
+        except Exception: pass
+async def fetch(url, timeout=8.0, limit=1 << 20):
+    for _ in range(4):
+        status, hdr, body = await _get(url, timeout, limit, True)
+        if status in (301, 302, 303, 307, 308) and hdr.get("location"): url = urljoin(url, hdr["location"]); continue
+        return status, hdr, body
+    raise ValueError("redirect loop")
+async def probe(url, timeout=6.0, limit=65536, depth=0):
+    import asyncio
+    u = urlsplit(url); scheme = u.scheme.lower()
+    if scheme in ("", "file"): return os.path.exists(unquote(u.path) if scheme else url), "file"
+    if scheme not in ("http", "https"): return None, "unsupported"
+    for _ in range(4):
+        try: status, hdr, body = await _get(url, timeout, limit)
+        except asyncio.TimeoutError: return False, "timeout"
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as e: return False, type(e).__name__
+        if status in (301, 302, 303, 307, 308) and hdr.get("location"): url = urljoin(url, hdr["location"]); continue
+        break
+    else: return False, "redirect loop"
+    if status == 204 or status >= 300: return False, f"http {status}"
+    hls = any(t in hdr.get("content-type", "").lower() for t in HLS_TYPES) or urlsplit(url).path.lower().endswith(".m3u8") or body.lstrip().startswith(b"#EXTM3U")
+    if not hls: return bool(body), f"http {status}"
+    text = body.decode("utf-8", "ignore")
+    if not text.lstrip().startswith("#EXTM3U"): return False, "bad playlist"
+    uris = [l.strip() for l in text.splitlines() if l.strip() and not l.startswith("#")]
+    if "#EXT-X-STREAM-INF" in text:
+        if not uris: return False, "empty master"
+        if depth < 2: return await probe(urljoin(url, uris[0]), timeout, limit, depth + 1)
+    return (True, "hls") if uris or "#EXT-X-ENDLIST" in text else (False, "empty playlist")
+class HealthProber:
+    def __init__(self, store, concurrency=256, per_host=8, timeout=6.0):
+        self.store, self.concurrency, self.per_host, self.timeout = store, concurrency, per_host, timeout
+        self.cancelled, self.thread = False, None
+    @property
+    def running(self): return self.thread is not None and self.thread.is_alive()
+    def check(self, urls, on_progress=None, on_done=None, every=200):
+        self.cancelled = False
+        def run():
+            import asyncio
+            try: asyncio.run(self._run(list(dict.fromkeys(urls)), on_progress, every))
+            finally:
+                self.store.flush()
+                if on_done: on_done()
+        self.thread = threading.Thread(target=run, daemon=True); self.thread.start()
+        return self.thread
+    def cancel(self): self.cancelled = True
+    async def _run(self, urls, on_progress, every):
+        import asyncio
+        sem, hosts, done = asyncio.Semaphore(self.concurrency), {}, [0]
+        async def one(url):
+            h = hosts.get(urlsplit(url).netloc)
+            if h is None: h = hosts[urlsplit(url).netloc] = asyncio.Semaphore(self.per_host)
+            async with h, sem:
+                if self.cancelled: return
+                ok, detail = await probe(url, self.timeout)
+            if ok is not None: self.store.put(url, ok, detail)
+            done[0] += 1
+            if on_progress and (done[0] % every == 0 or done[0] == len(urls)): on_progress(done[0], len(urls))
+        await asyncio.gather(*(one(u) for u in urls))
@@ -0,0 +1,26 @@
+import threading, traceback
+class UpdateScheduler:
+    def __init__(self, work, partial=None):
+        self.work, self.partial, self.lock = work, partial, threading.Lock()
+        self.gen, self.dirty, self.full, self.running = 0, False, False, False
+    @property
+    def busy(self): return self.running
+    def request(self, full=True):
+        with self.lock:
+            if full or self.partial is None: self.gen += 1; self.full = True
+            self.dirty = True
+            if self.running: return self.gen
+            self.running = True
+        threading.Thread(target=self._run, daemon=True).start()
+        return self.gen
+    def current(self, gen): return gen == self.gen
+    def stale(self, gen): return lambda: gen != self.gen
+    def cancel(self):
+        with self.lock: self.gen += 1; self.dirty = self.full = False
+    def _run(self):
+        while True:
+            with self.lock:
+                if not self.dirty: self.running = False; return
+                self.dirty, gen, full, self.full = False, self.gen, self.full, False
+            try: (self.work if full else self.partial)(gen)
+            except Exception: traceback.print_exc()
@@ -0,0 +1,27 @@
+import os, zlib, pickle
+from array import array
+from collections import namedtuple
+from playlist_store import Entry, GROUPS, group_id
+import m3u
+MAGIC, VERSION = b"MPVS", 1
+Snapshot = namedtuple("Snapshot", "meta entries shown favorites")
+def default_path(frontend, socket_path): return os.path.join(m3u.CACHE_DIR, f"view-{frontend}-{m3u.normalize(socket_path)}.snap")
+def save(path, entries, shown, favorites, **meta):
+    used = sorted({e.gid for e in entries}); remap = {g: k for k, g in enumerate(used)}
+    cols = ([e.name for e in entries], [e.filename for e in entries], array("I", (remap[e.gid] for e in entries)).tobytes(), [GROUPS[g] for g in used],
+            array("I", shown).tobytes(), bytes(e.name in favorites for e in entries))
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True); tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f: f.write(MAGIC + bytes([VERSION]) + zlib.compress(pickle.dumps((meta, cols), pickle.HIGHEST_PROTOCOL), 1))
+        os.replace(tmp, path)
+        return True
+    except OSError: return False
+def load(path):
+    try:
+        with open(path, "rb") as f: raw = f.read()
+        if raw[:4] != MAGIC or raw[4] != VERSION: return None
+        meta, (names, files, gids, groups, shown, favs) = pickle.loads(zlib.decompress(raw[5:]))
+    except Exception: return None
+    gmap = [group_id(g) for g in groups]
+    entries = list(map(Entry, names, files, range(len(names)), map(gmap.__getitem__, array("I", gids))))
+    return Snapshot(meta, entries, [entries[p] for p in array("I", shown) if p < len(entries)], {names[k] for k in range(len(favs)) if favs[k]} if any(favs) else set())
@@ -0,0 +1,73 @@
+import time, threading
+from collections import deque
+from urllib.parse import urlsplit
+from perf_stats import STATS
+import stream_health
+EVENTS = ("start-file", "playback-restart", "end-file")
+PREFETCH = {"prefetch-playlist": "yes", "cache": "yes"}
+def host_of(url):
+    u = urlsplit(url or "")
+    return u.hostname or ("local" if url else "?")
+def _pct(xs, q): return xs[min(len(xs) - 1, int(q * len(xs)))] if xs else 0.0
+class ZapTracker:
+    def __init__(self, window=100, timeout=30.0):
+        self.window, self.timeout, self.lock = window, timeout, threading.Lock()
+        self.pending, self.samples, self.failed, self.last = None, {}, {}, None
+    def begin(self, url, group=""):
+        with self.lock: self.pending = [url, group or "Uncategorized", time.perf_counter(), None]
+    def ack(self, url, reply):
+        if reply is not None and reply.get("error") == "success": return
+        with self.lock:
+            if self.pending and self.pending[0] == url: self.pending = None
+    def on_event(self, ev):
+        name, now = ev.get("event"), time.perf_counter()
+        with self.lock:
+            p = self.pending
+            if p is None: return None
+            if now - p[2] > self.timeout: self.pending = None; return None
+            if name == "start-file": p[3] = now; return None
+            if p[3] is None: return None
+            if name == "end-file" and ev.get("reason") == "error":
+                self.pending = None
+                for k in (("host", host_of(p[0])), ("group", p[1])): self.failed[k] = self.failed.get(k, 0) + 1
+                return None
+            if name != "playback-restart": return None
+            self.pending = None
+            return self._add(p[0], p[1], p[2], now)
+    def _add(self, url, group, t0, t1):
+        d, host = t1 - t0, host_of(url)
+        for k in (("host", host), ("group", group)):
+            q = self.samples.get(k)
+            if q is None: q = self.samples[k] = deque(maxlen=self.window)
+            q.append(d)
+        self.last = (url, d)
+        STATS.record("zap", host, t0, t1)
+        return url, d
+    def reset(self):
+        with self.lock: self.samples.clear(); self.failed.clear(); self.last = None
+    def rows(self):
+        with self.lock: items = {k: sorted(self.samples.get(k, ())) for k in {*self.samples, *self.failed}}; failed = dict(self.failed)
+        return sorted((kind, key, len(xs), sum(xs) / len(xs) if xs else 0.0, _pct(xs, 0.5), _pct(xs, 0.95), failed.get((kind, key), 0)) for (kind, key), xs in items.items())
+    def snapshot(self):
+        return {"window": self.window, "last": self.last, "stats": [dict(zip(("kind", "key", "count", "mean", "p50", "p95", "failed"), r)) for r in self.rows()]}
+    def summary(self):
+        lines = [f"{'by':<6} {'key':<34} {'n':>5} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'fail':>5}"]
+        for kind, key, n, mean, p50, p95, failed in self.rows():
+            lines.append(f"{kind:<6} {key[:34]:<34} {n:>5} {mean * 1000:9.1f} {p50 * 1000:8.1f} {p95 * 1000:8.1f} {failed:>5}")
+        if self.last: lines.append(f"\nlast: {self.last[1] * 1000:.0f} ms  {self.last[0]}")
+        return "\n".join(lines) if len(lines) > 1 else "No channel switches measured yet."
+class Prewarmer:
+    def __init__(self, ttl=60.0, timeout=3.0, limit=4096):
+        self.ttl, self.timeout, self.limit = ttl, timeout, limit
+        self.lock, self.warmed = threading.Lock(), {}
+    def prefetch(self, client):
+        return client.command_many([{"command": ["set_property", k, v]} for k, v in PREFETCH.items()], 1.0)
+    def warm(self, urls):
+        now = time.monotonic()
+        with self.lock:
+            todo = [u for u in dict.fromkeys(urls) if u and now - self.warmed.get(u, -self.ttl) >= self.ttl]
+            for u in todo: self.warmed[u] = now
+        if not todo: return None
+        import asyncio
+        async def run(): await asyncio.gather(*(stream_health.probe(u, self.timeout, self.limit) for u in todo))
+        t = threading.Thread(target=asyncio.run, args=(run(),), daemon=True); t.start(); return t